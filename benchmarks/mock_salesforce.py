@@ -0,0 +1,270 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import polars as pl
+
+# Local stand-in for the Salesforce REST and Bulk2 APIs used by the connector benchmarks.
+# It serves describe, query/nextRecordsUrl, limits, the composite sObject collections and the
+# Bulk2 ingest and query job endpoints over plain HTTP, with per-request latency and failure injection.
+
+_API_LIMIT = 15_000_000
+_QUERY_PAGE_ROWS = 2000
+_FIELDS = {
+    'Id': 'id', 'Name': 'string', 'AnnualRevenue': 'currency', 'NumberOfEmployees': 'int', 'CreatedDate': 'datetime',
+}
+
+
+def records(fields: list[str], start: int, stop: int) -> pl.DataFrame:
+    """Generate rows start..stop of the mock Account table."""
+    i = pl.int_range(start, stop, eager=True)
+    columns = {
+        'Id': '001' + i.cast(pl.String).str.zfill(15),
+        'Name': 'Account-' + i.cast(pl.String),
+        'AnnualRevenue': i * 1.5,
+        'NumberOfEmployees': i % 5000,
+        'CreatedDate': pl.repeat('2024-01-01T00:00:00.000+0000', stop - start, eager=True),
+    }
+    return pl.DataFrame({name: columns.get(name, pl.repeat(None, stop - start, dtype=pl.String, eager=True))
+                         for name in fields})
+
+
+class MockSalesforce:
+    """Mock org served from a background thread.
+
+    rows sets the size of the table queries read. latency is added to every request, failure_rate
+    answers that share of composite calls and Bulk2 data transfers with 503 (the requests the connector
+    retries), lock_rate fails that share of composite rows with UNABLE_TO_LOCK_ROW, and bulk2_delay is
+    how long a closed ingest job stays InProgress.
+    """
+    def __init__(self,
+                 rows: int = 1000,
+                 latency: float = 0.0,
+                 failure_rate: float = 0.0,
+                 lock_rate: float = 0.0,
+                 bulk2_delay: float = 0.0,
+                 seed: int = 0) -> None:
+        self.rows = rows
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock_rate = lock_rate
+        self.bulk2_delay = bulk2_delay
+        self._random = random.Random(seed)
+        self._jobs = {}
+        self._ids = 0
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def instance(self) -> str:
+        host, port = self._server.server_address
+        return f"{host}:{port}"
+
+    def start(self) -> 'MockSalesforce':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'MockSalesforce':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def stats(self, reset: bool = False) -> dict[str, int]:
+        """Request counts by endpoint, plus injected failures and bytes in and out."""
+        with self._lock:
+            counts = dict(self._counts)
+            if reset:
+                self._counts.clear()
+        return counts
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counts[key] += amount
+
+    def _chance(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def _new_ids(self, prefix: str, n: int) -> list[str]:
+        with self._lock:
+            start, self._ids = self._ids, self._ids + n
+        return [f"{prefix}{i:015d}" for i in range(start, start + n)]
+
+    def route(self, method: str, path: str, query: dict, body: bytes) -> tuple[int, dict, bytes]:
+        """Dispatch one request and return the status, headers and body of the response."""
+        path = re.sub(r'^/services/data/v[\d.]+', '', path).rstrip('/')
+        if path.startswith('/composite/sobjects'):
+            self._count('composite')
+            if self._chance(self.failure_rate):
+                return self._failure()
+            return self._composite(method, path, query, body)
+        if path.startswith('/jobs/'):
+            return self._bulk2(method, path.split('/')[2:], query, body)
+        if path.endswith('/describe'):
+            self._count('describe')
+            return _json({"fields": [{"name": name, "type": kind} for name, kind in _FIELDS.items()]})
+        if path in ('/query', '/queryAll'):
+            self._count('query')
+            return self._query(query['q'][0], 0)
+        if path.startswith(('/query/', '/queryAll/')):
+            self._count('query')
+            cursor, offset = path.rsplit('/', 1)[1].split('-')
+            return self._query(self._jobs[cursor]['query'], int(offset), cursor)
+        if path == '/limits':
+            self._count('limits')
+            used = self.stats().get('requests', 0)
+            return _json({"DailyApiRequests": {"Max": _API_LIMIT, "Remaining": _API_LIMIT - used}})
+        return _json([{"errorCode": "NOT_FOUND", "message": f"{method} {path}"}], 404)
+
+    def _failure(self) -> tuple[int, dict, bytes]:
+        self._count('failures')
+        return _json([{"errorCode": "SERVER_UNAVAILABLE", "message": "Injected failure"}], 503)
+
+    def _composite(self, method: str, path: str, query: dict, body: bytes) -> tuple[int, dict, bytes]:
+        if method == 'DELETE':
+            ids = query['ids'][0].split(',')
+        else:
+            sent = json.loads(body)['records']
+            ids = [record.get('Id') for record in sent] if method == 'PATCH' else self._new_ids('001', len(sent))
+        upsert = method == 'PATCH' and path.count('/') == 4
+        results = []
+        for record_id in ids:
+            if self._chance(self.lock_rate):
+                results.append({"id": None, "success": False, "errors": [
+                    {"statusCode": "UNABLE_TO_LOCK_ROW", "message": "Injected row lock", "fields": []}]})
+                continue
+            result = {"id": record_id or self._new_ids('001', 1)[0], "success": True, "errors": []}
+            if upsert:
+                result["created"] = record_id is None
+            results.append(result)
+        return _json(results)
+
+    def _query(self, soql: str, offset: int, cursor: str | None = None) -> tuple[int, dict, bytes]:
+        fields, total = _parse_query(soql, self.rows)
+        if fields == ['COUNT()']:
+            return _json({"totalSize": total, "done": True, "records": []})
+        stop = min(total, offset + _QUERY_PAGE_ROWS)
+        page = records(fields, offset, stop)
+        attributes = pl.Series('attributes', [{'type': 'Account', 'url': ''}]).new_from_index(0, page.height)
+        body = {"totalSize": total, "done": stop >= total}
+        if stop < total:
+            cursor = cursor or self._new_job({"query": soql})
+            body["nextRecordsUrl"] = f"/services/data/v62.0/query/{cursor}-{stop}"
+        # The records array is written column-wise by polars and spliced into the envelope
+        content = json.dumps(body)[:-1] + ', "records": ' + attributes.to_frame().hstack(page).write_json() + '}'
+        return 200, {'Content-Type': 'application/json'}, content.encode()
+
+    def _new_job(self, job: dict) -> str:
+        job_id = self._new_ids('750', 1)[0]
+        with self._lock:
+            self._jobs[job_id] = job
+        return job_id
+
+    def _bulk2(self, method: str, parts: list[str], query: dict, body: bytes) -> tuple[int, dict, bytes]:
+        kind, job_id, resource = parts[0], parts[1] if len(parts) > 1 else None, parts[2] if len(parts) > 2 else None
+        if job_id is None:
+            self._count(f'bulk2.{kind}.create')
+            payload = json.loads(body)
+            job_id = self._new_job({**payload, 'state': 'Open' if kind == 'ingest' else 'JobComplete', 'data': []})
+            return _json({"id": job_id, "state": self._jobs[job_id]['state']})
+        job = self._jobs[job_id]
+        if resource is None and method == 'PATCH':
+            self._count(f'bulk2.{kind}.state')
+            state = json.loads(body)['state']
+            job['state'] = 'InProgress' if state == 'UploadComplete' else state
+            job['done_at'] = time.monotonic() + self.bulk2_delay
+            return _json({"id": job_id, "state": job['state']})
+        if resource is None:
+            self._count(f'bulk2.{kind}.poll')
+            if job['state'] == 'InProgress' and time.monotonic() >= job['done_at']:
+                job['state'] = 'JobComplete'
+            rows = sum(chunk.count(b'\n') - 1 for chunk in job['data']) if kind == 'ingest' else self.rows
+            return _json({"id": job_id, "state": job['state'], "numberRecordsProcessed": rows, "numberRecordsFailed": 0})
+        self._count(f'bulk2.{kind}.data')
+        if self._chance(self.failure_rate):
+            return self._failure()
+        if resource == 'batches':
+            job['data'].append(body)
+            return 201, {}, b''
+        if kind == 'query':
+            return self._query_results(job, query)
+        return self._ingest_results(job, resource)
+
+    def _query_results(self, job: dict, query: dict) -> tuple[int, dict, bytes]:
+        fields, total = _parse_query(job['query'], self.rows)
+        offset = int(query.get('locator', ['0'])[0])
+        stop = min(total, offset + int(query.get('maxRecords', ['50000'])[0]))
+        headers = {'Content-Type': 'text/csv', 'Sforce-NumberOfRecords': str(stop - offset),
+                   'Sforce-Locator': str(stop) if stop < total else 'null'}
+        return 200, headers, records(fields, offset, stop).write_csv().encode()
+
+    def _ingest_results(self, job: dict, resource: str) -> tuple[int, dict, bytes]:
+        if resource != 'successfulResults' or not job['data']:
+            return 200, {'Content-Type': 'text/csv'}, b''
+        frames = [pl.read_csv(chunk, infer_schema=False) for chunk in job['data']]
+        df = pl.concat(frames, how='diagonal_relaxed')
+        ids = df['Id'] if 'Id' in df.columns else pl.Series(self._new_ids('001', df.height))
+        df = df.select(pl.Series('sf__Id', ids), pl.lit(job['operation'] == 'insert').alias('sf__Created'), pl.all())
+        return 200, {'Content-Type': 'text/csv'}, df.write_csv().encode()
+
+
+def _parse_query(soql: str, rows: int) -> tuple[list[str], int]:
+    """Return the selected fields of a query and how many rows it matches."""
+    match = re.match(r'\s*SELECT\s+(.*?)\s+FROM\s+\w+', soql, re.IGNORECASE | re.DOTALL)
+    fields = [field.strip() for field in match.group(1).split(',')]
+    limit = re.search(r'\bLIMIT\s+(\d+)', soql, re.IGNORECASE)
+    return fields, min(rows, int(limit.group(1))) if limit else rows
+
+
+def _json(body, status: int = 200) -> tuple[int, dict, bytes]:
+    return status, {'Content-Type': 'application/json'}, json.dumps(body).encode()
+
+
+def _handler(org: MockSalesforce) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so the connector's pooled connections are reused as they would be against Salesforce
+        protocol_version = 'HTTP/1.1'
+
+        def handle_one_request(self) -> None:
+            try:
+                super().handle_one_request()
+            except ConnectionError:
+                self.close_connection = True
+
+        def _serve(self) -> None:
+            url = urlparse(self.path)
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if org.latency:
+                time.sleep(org.latency)
+            status, headers, content = org.route(self.command, url.path, parse_qs(url.query), body)
+            org._count('bytes_in', len(body))
+            org._count('bytes_out', len(content))
+            self.send_response(status)
+            headers = {**headers, 'Content-Length': str(len(content)),
+                       'Sforce-Limit-Info': f"api-usage={org.stats().get('requests', 0)}/{_API_LIMIT}"}
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(content)
+            org._count('requests')
+
+        do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _serve
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    return Handler
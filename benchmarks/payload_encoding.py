@@ -0,0 +1,42 @@
+import json
+import time
+import polars as pl
+
+from rev_connectors.salesforce import Salesforce
+
+# Composite payload encoding benchmark
+# Compares the previous per-row path (to_dicts + stdlib json) with the columnar polars encoder.
+
+
+def legacy_encode(batch: pl.DataFrame, sobject: str, all_or_none: bool) -> bytes:
+    records = [{"attributes": {"type": sobject}, **record} for record in batch.to_dicts()]
+    return json.dumps({"allOrNone": all_or_none, "records": records}).encode()
+
+
+def columnar_encode(batch: pl.DataFrame, sobject: str, all_or_none: bool) -> bytes:
+    return (b'{"allOrNone":' + (b'true' if all_or_none else b'false') +
+            b',"records":' + Salesforce._encode_records(batch, sobject) + b'}')
+
+
+def run(encode, data: pl.DataFrame, batch_size: int = 200) -> float:
+    start = time.perf_counter()
+    for batch in data.iter_slices(batch_size):
+        encode(batch, "Account", False)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows = 200_000
+    data = pl.DataFrame({
+        "Name": [f"Test-Account-{i}" for i in range(rows)],
+        "My_Ext_Field__c": [f"EXT-{i}" for i in range(rows)],
+        "AnnualRevenue": [i * 1.5 for i in range(rows)],
+        "NumberOfEmployees": list(range(rows)),
+        "Description": ["Lorem ipsum dolor sit amet"] * rows,
+        "Active__c": [i % 2 == 0 for i in range(rows)],
+    })
+    legacy = run(legacy_encode, data)
+    columnar = run(columnar_encode, data)
+    print(f"to_dicts + json: {legacy:.2f}s ({rows / legacy:,.0f} rows/s)")
+    print(f"polars columnar: {columnar:.2f}s ({rows / columnar:,.0f} rows/s)")
+    print(f"speedup:         {legacy / columnar:.1f}x")
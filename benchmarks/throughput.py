@@ -0,0 +1,130 @@
+import argparse
+import json
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import polars as pl
+from requests.adapters import HTTPAdapter
+
+from mock_salesforce import MockSalesforce
+from rev_connectors.salesforce import Salesforce
+
+# Connector throughput benchmark against the local mock Salesforce server
+# Runs read/create/update/delete through REST and Bulk2 at each row count and reports rows/s, peak RSS
+# and the requests the server saw. Each case runs in a fresh process so its peak RSS is its own.
+#
+#   python benchmarks/throughput.py --rows 1000 10000 100000 1000000 --latency 0.02 --failure-rate 0.01
+#   python benchmarks/throughput.py --save baseline.json
+#   python benchmarks/throughput.py --baseline baseline.json --tolerance 0.25
+
+
+class PlainHTTPAdapter(HTTPAdapter):
+    """Sends the connector's https:// requests to the plain HTTP mock server."""
+    def send(self, request, **kwargs):
+        request.url = 'http://' + request.url[len('https://'):]
+        return super().send(request, **kwargs)
+
+
+def connect(instance: str, max_workers: int, max_request_rate: float) -> Salesforce:
+    conn = Salesforce(credentials={'session_id': 'mock', 'instance': instance, 'version': '62.0'},
+                      pool_size=max(10, max_workers), max_request_rate=max_request_rate)
+    pooled = conn.session.get_adapter('https://')
+    conn.session.mount('https://', PlainHTTPAdapter(pool_connections=pooled._pool_connections,
+                                                    pool_maxsize=pooled._pool_maxsize,
+                                                    max_retries=pooled.max_retries))
+    return conn
+
+
+def input_rows(operation: str, rows: int) -> pl.DataFrame:
+    i = pl.int_range(0, rows, eager=True)
+    ids = '001' + i.cast(pl.String).str.zfill(15)
+    if operation == 'delete':
+        return pl.DataFrame({'Id': ids})
+    df = pl.DataFrame({'Name': 'Account-' + i.cast(pl.String), 'AnnualRevenue': i * 1.5, 'NumberOfEmployees': i % 5000})
+    return df.insert_column(0, ids) if operation == 'update' else df
+
+
+def run_case(instance: str, operation: str, method: str, rows: int, options: dict) -> dict:
+    """Run one operation in this process and return its timing and peak RSS."""
+    conn = connect(instance, options['max_workers'], options['max_request_rate'])
+    data = None if operation == 'read' else input_rows(operation, rows)
+    start = time.perf_counter()
+    if operation == 'read':
+        df = conn.read(f"SELECT Id, Name, AnnualRevenue, NumberOfEmployees FROM Account LIMIT {rows}",
+                       method=method, output_dir=None)
+    else:
+        df = getattr(conn, operation)('Account', data, method=method, output_dir=None,
+                                      batch_size=options['batch_size'], max_workers=options['max_workers'])
+    seconds = time.perf_counter() - start
+    if df.height != rows:
+        raise RuntimeError(f"{operation} through {method} returned {df.height} rows, expected {rows}")
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    return {'seconds': seconds, 'peak_rss_mb': peak}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Connector throughput against a mock Salesforce server')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--operations', nargs='+', default=['read', 'create', 'update', 'delete'],
+                        choices=['read', 'create', 'update', 'delete'])
+    parser.add_argument('--methods', nargs='+', default=['rest', 'bulk2'], choices=['rest', 'bulk2'])
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every request')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of retryable requests answered with 503')
+    parser.add_argument('--lock-rate', type=float, default=0.0, help='share of composite rows failing UNABLE_TO_LOCK_ROW')
+    parser.add_argument('--bulk2-delay', type=float, default=0.0, help='seconds a Bulk2 ingest job stays InProgress')
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--max-request-rate', type=float, default=50.0, help='connector request rate limit per second')
+    parser.add_argument('--save', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='fail when rows/s falls more than --tolerance below this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    options = {'batch_size': args.batch_size, 'max_workers': args.max_workers, 'max_request_rate': args.max_request_rate}
+    results = []
+    print(f"{'operation':<10}{'method':<8}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}{'requests':>10}"
+          f"{'failures':>10}")
+    with MockSalesforce(latency=args.latency, failure_rate=args.failure_rate, lock_rate=args.lock_rate,
+                        bulk2_delay=args.bulk2_delay) as org:
+        for rows in args.rows:
+            org.rows = rows
+            for operation in args.operations:
+                for method in args.methods:
+                    org.stats(reset=True)
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                        case = pool.submit(run_case, org.instance, operation, method, rows, options).result()
+                    stats = org.stats()
+                    case.update(operation=operation, method=method, rows=rows, rows_per_sec=rows / case['seconds'],
+                                requests=stats.get('requests', 0), failures=stats.get('failures', 0), endpoints=stats)
+                    results.append(case)
+                    print(f"{operation:<10}{method:<8}{rows:>10,}{case['seconds']:>10.2f}{case['rows_per_sec']:>12,.0f}"
+                          f"{case['peak_rss_mb']:>10.0f}{case['requests']:>10,}{case['failures']:>10,}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        return compare(results, args.baseline, args.tolerance)
+    return 0
+
+
+def compare(results: list[dict], path: str, tolerance: float) -> int:
+    """Print the cases slower than the baseline by more than the tolerance and return the exit status."""
+    with open(path) as f:
+        baseline = {(case['operation'], case['method'], case['rows']): case for case in json.load(f)}
+    regressions = 0
+    for case in results:
+        base = baseline.get((case['operation'], case['method'], case['rows']))
+        if base and case['rows_per_sec'] < base['rows_per_sec'] * (1 - tolerance):
+            regressions += 1
+            print(f"REGRESSION {case['operation']} {case['method']} {case['rows']:,} rows: "
+                  f"{case['rows_per_sec']:,.0f} rows/s vs {base['rows_per_sec']:,.0f} in {path}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,28 @@
 import polars as pl
+import logging
+import random
+import threading
+import time
 
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Returned by _span when instrumentation is off, so disabled spans cost one attribute check
+_DISABLED = nullcontext()
+# Retry backoff doubles from the base per attempt up to the cap, with jitter
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 30.0
 
 
 class BaseConnector(ABC):
+    # Instrumentation is off until a hook or tracer is registered
+    _hooks: tuple = ()
+    _tracer = None
+
     @abstractmethod
     def __init__(self, df: pl.DataFrame) -> None:
         ...
@@ -24,4 +43,154 @@ class BaseConnector(ABC):
     @abstractmethod
     def delete(self) -> pl.DataFrame:
         ...
-        
\ No newline at end of file
+
+    def instrument(self, hook: Callable[[str, dict], None] | None = None, tracer=None) -> None:
+        """Report a span for every batch, page, job and request of this connector.
+
+        hook is called as hook(name, attributes) when each span ends, with its duration in seconds
+        and counters such as rows, bytes_sent and retries. tracer is an OpenTelemetry Tracer (or
+        anything with start_as_current_span); its spans get the same attributes.
+        """
+        if hook is not None:
+            self._hooks = (*self._hooks, hook)
+        if tracer is not None:
+            self._tracer = tracer
+
+    def _span(self, name: str, **attributes):
+        """Return a context manager timing one operation, yielding its attributes dict (None when disabled)."""
+        if not self._hooks and self._tracer is None:
+            return _DISABLED
+        return _Span(self._hooks, self._tracer, name, attributes)
+
+
+class _Span:
+    """Times one operation and reports its attributes to the connector's hooks and tracer."""
+    __slots__ = ('_hooks', '_tracer', '_name', '_attributes', '_start', '_context', '_otel')
+
+    def __init__(self, hooks: tuple, tracer, name: str, attributes: dict) -> None:
+        self._hooks = hooks
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._context = self._otel = None
+
+    def __enter__(self) -> dict:
+        if self._tracer is not None:
+            self._context = self._tracer.start_as_current_span(self._name)
+            self._otel = self._context.__enter__()
+        self._start = time.perf_counter()
+        return self._attributes
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        attributes = self._attributes
+        attributes['duration'] = time.perf_counter() - self._start
+        if exc is not None:
+            attributes['error'] = exc_type.__name__
+        if self._otel is not None:
+            # OpenTelemetry attributes can't be None
+            self._otel.set_attributes({key: value for key, value in attributes.items() if value is not None})
+            self._context.__exit__(exc_type, exc, tb)
+        for hook in self._hooks:
+            try:
+                hook(self._name, attributes)
+            except Exception:
+                logger.exception(f"Instrumentation hook failed for {self._name}")
+        return False
+
+
+class _RateLimiter:
+    """Paces requests to one API across threads with a token bucket whose rate adapts by AIMD.
+
+    Each successful request raises the rate additively (by about one request per second, per second)
+    and a throttled response halves it, at most once a second so that a burst of concurrent failures
+    counts as a single signal. The rate settles just below what the API sustains. It starts at half
+    of max_rate unless initial_rate is given.
+    """
+    def __init__(self, max_rate: float, min_rate: float = 0.5, initial_rate: float | None = None) -> None:
+        self._max_rate = max_rate
+        self._min_rate = min(min_rate, max_rate)
+        self._rate = max(self._min_rate, min(max_rate, max_rate / 2 if initial_rate is None else initial_rate))
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._decreased = float('-inf')
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def max_rate(self) -> float:
+        return self._max_rate
+
+    def lower_max_rate(self, max_rate: float) -> None:
+        """Lower the rate cap, never raising it, e.g. when another caller of the same API asks for less."""
+        with self._lock:
+            self._max_rate = min(self._max_rate, max_rate)
+            self._min_rate = min(self._min_rate, self._max_rate)
+            self._rate = min(self._rate, self._max_rate)
+
+    def acquire(self) -> None:
+        while (delay := self.reserve()) > 0:
+            time.sleep(delay)
+
+    def reserve(self) -> float:
+        """Take a token and return 0 if one is available, otherwise return how long until the next one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(1.0, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            return (1.0 - self._tokens) / self._rate
+
+    def succeed(self) -> None:
+        with self._lock:
+            self._rate = min(self._max_rate, self._rate + 1.0 / self._rate)
+
+    def throttle(self, attempt: int, retry_after: str | None = None) -> float:
+        """Halve the rate and return the backoff delay for the given attempt."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._decreased >= 1.0:
+                self._rate = max(self._min_rate, self._rate / 2)
+                self._decreased = now
+        return _backoff(attempt, retry_after)
+
+
+def _backoff(attempt: int, retry_after: str | None = None) -> float:
+    """Jittered exponential backoff delay for a retry attempt, at least the server's Retry-After seconds."""
+    delay = min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+    try:
+        return max(delay, float(retry_after)) if retry_after is not None else delay
+    except (TypeError, ValueError):
+        return delay
+
+
+class Metrics:
+    """Instrumentation hook aggregating span counts, durations and numeric attributes per span name.
+
+    conn.instrument(metrics) and then metrics.to_frame() shows where the time of a load went.
+    """
+    def __init__(self) -> None:
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, attributes: dict) -> None:
+        with self._lock:
+            totals = self._totals[name]
+            totals['count'] += 1
+            for key, value in attributes.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    totals[key] += value
+
+    def to_frame(self) -> pl.DataFrame:
+        """One row per span name with its count and the sums of its numeric attributes."""
+        with self._lock:
+            rows = [{'span': name, **totals} for name, totals in self._totals.items()]
+        return pl.DataFrame(rows) if rows else pl.DataFrame()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
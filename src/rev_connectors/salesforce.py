@@ -4,201 +4,801 @@ import logging
 import requests
 import io
 import os
+import json
+import glob
+import hashlib
+import inspect
+import shutil
+import sqlite3
+from datetime import date, datetime, timezone
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import cache, partial
+from typing import Iterator
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from polars.io.plugins import register_io_source
 from simple_salesforce import Salesforce as SF
-from itertools import batched
-from . import BaseConnector
+from simple_salesforce.exceptions import SalesforceExpiredSession
+from simple_salesforce.bulk2 import MAX_INGEST_JOB_FILE_SIZE, ColumnDelimiter, LineEnding, Operation, ResultsType
+from . import BaseConnector, _RateLimiter
 
 logger = logging.getLogger(__name__)
 
+# Salesforce describe field types mapped to Polars dtypes (compound and binary fields are not queryable in bulk)
+_FIELD_TYPES = {
+    'id': pl.String, 'reference': pl.String, 'string': pl.String, 'textarea': pl.String, 'picklist': pl.String,
+    'multipicklist': pl.String, 'combobox': pl.String, 'phone': pl.String, 'email': pl.String, 'url': pl.String,
+    'encryptedstring': pl.String, 'anyType': pl.String, 'boolean': pl.Boolean, 'int': pl.Int64, 'long': pl.Int64,
+    'double': pl.Float64, 'currency': pl.Float64, 'percent': pl.Float64, 'date': pl.Date,
+    'datetime': pl.Datetime('ms', 'UTC'), 'time': pl.Time,
+}
+# Per-record results of the composite sObject collections API
+_COMPOSITE_RESULT_SCHEMA = {
+    'id': pl.String,
+    'success': pl.Boolean,
+    'errors': pl.List(pl.Struct({'statusCode': pl.String, 'message': pl.String, 'fields': pl.List(pl.String)})),
+}
+_UPSERT_RESULT_SCHEMA = {**_COMPOSITE_RESULT_SCHEMA, 'created': pl.Boolean}
+# Composite collections accept 200 records per call; Bulk2 accepts 100 MB of CSV per job upload
+_COMPOSITE_MAX_RECORDS = 200
+_COMPOSITE_TARGET_BYTES = 4 * 1024 * 1024
+_BULK2_MAX_UPLOAD_BYTES = MAX_INGEST_JOB_FILE_SIZE - 1024 * 1024
+# Rows per slice when streaming a Bulk2 load into CSV payloads
+_BULK2_STREAM_ROWS = 100_000
+# method='auto' uses Bulk2 above this many rows, or when REST would spend more than this share of the remaining API requests
+_BULK2_ROW_THRESHOLD = 10_000
+_REST_API_BUDGET = 0.1
+_COMPARISON_OPS = {'Eq': '=', 'NotEq': '!=', 'Lt': '<', 'LtEq': '<=', 'Gt': '>', 'GtEq': '>='}
+_FLIPPED_OPS = {'Eq': 'Eq', 'NotEq': 'NotEq', 'Lt': 'Gt', 'LtEq': 'GtEq', 'Gt': 'Lt', 'GtEq': 'LtEq'}
+# Only newer polars releases accept a name for an IO source's explain() output
+_NAMED_IO_SOURCES = 'explain_name' in inspect.signature(register_io_source).parameters
+# Bulk2 ingest result sets keyed by the status column value they are reported under
+_INGEST_STATUSES = {"success": ResultsType.successful.value, "failed": ResultsType.failed.value,
+                    "unprocessed": ResultsType.unprocessed.value}
+# Bulk2 job status polling starts at the minimum interval and backs off to the maximum
+_BULK2_POLL_MIN = 0.5
+_BULK2_POLL_MAX = 15.0
+# Error codes that mean the org is throttling or contended and the request can be retried after a backoff
+_THROTTLE_ERRORS = ('REQUEST_LIMIT_EXCEEDED', 'UNABLE_TO_LOCK_ROW')
+# Digits of a Salesforce Id in sort order, used to split Id ranges for chunked extraction
+_ID_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
 
 @pl.api.register_dataframe_namespace('salesforce')
 class Salesforce(BaseConnector):
     """Connector for Salesforce using simple_salesforce and Polars."""
-    def __init__(self, credentials: dict) -> None:
-        self.sf = SF(**credentials)
+    def __init__(self, 
+                 credentials: dict, 
+                 pool_size: int = 10, 
+                 max_retries: int = 3, 
+                 timeout: float | tuple[float, float] = (10, 300),
+                 describe_cache_dir: str | None = None,
+                 describe_cache_ttl: float = 86400,
+                 cache_dir: str | None = None,
+                 cache_ttl: float = 3600,
+                 cache_max_bytes: int = 1024 ** 3,
+                 max_request_rate: float = 50.0,
+                 session_cache_dir: str | None = None) -> None:
+        # One pooled, keep-alive session shared by simple_salesforce and the composite REST calls
+        credentials = dict(credentials)
+        self.session = credentials.pop('session', None) or self._build_session(pool_size, max_retries)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        # Username logins are cached per process (and optionally on disk) and renewed when the session expires
+        self.session_cache_dir = session_cache_dir
+        self._credentials = credentials
+        self._session_key = _session_key(credentials)
+        self._login_lock = threading.Lock()
+        # Authorization header of the last simple_salesforce request sent on each thread
+        self._sent = threading.local()
+        if self._session_key is None:
+            self.sf = SF(**credentials, session=self.session)
+        else:
+            session_id, instance = self._login()
+            options = {name: credentials[name] for name in ('version', 'proxies', 'domain') if name in credentials}
+            self.sf = SF(session_id=session_id, instance=instance, session=self.session, **options)
+            # simple_salesforce logs in again through this hook when a query hits INVALID_SESSION_ID
+            self.sf._salesforce_login_partial = self._renew_sent_session
+        # Every connector to the same org shares one rate limiter, which also tracks the org's API usage
+        self._limiter = _rate_limiter(self.sf.sf_instance, max_request_rate)
+        self.session.hooks['response'].append(self._track_limits)
+        # Queries, describes and Bulk2 client calls of simple_salesforce are paced and retried like composite calls
+        self.sf.session = _PacedSession(self)
+        # sObject describe metadata, cached in memory and optionally on disk for describe_cache_ttl seconds
+        self.describe_cache_dir = describe_cache_dir
+        self.describe_cache_ttl = describe_cache_ttl
+        self._describe_cache = {}
+        self._describe_lock = threading.Lock()
         self.version = self.sf.sf_version
         self.headers = {"Authorization": f"Bearer {self.sf.session_id}", "Content-Type": "application/json"}
+        # Opt-in on-disk query result cache, scoped to this org and API version
+        self._result_cache = _ResultCache(
+            os.path.join(cache_dir, self.sf.sf_instance, f"v{self.version}"), cache_ttl, cache_max_bytes
+        ) if cache_dir else None
 
     def create(self, 
                sobject: str, 
-               data: pl.DataFrame = None, 
+               data: pl.DataFrame | pl.LazyFrame = None, 
                input_file: str = None,
                method: str = 'rest', 
                to_dataframe: bool = True, 
                output_dir: str | None = 'results',
                upsert_key: str = None, 
-               batch_size: int = 200, 
-               all_or_none: bool = False) -> pl.DataFrame:
-        """Execute a Batched REST or Bulk - Insert or Upsert operation."""
+               batch_size: int | None = 200, 
+               all_or_none: bool = False,
+               max_workers: int = 1,
+               job_key: str | None = None) -> pl.DataFrame:
+        """Execute a Batched REST or Bulk - Insert or Upsert operation.
+
+        method='auto' picks REST or Bulk2 from the data volume and remaining API requests, and
+        batch_size=None sizes REST batches adaptively from payload bytes and observed latency.
+        data may be a LazyFrame and input_file a CSV file or Parquet dataset; Bulk2 streams either
+        in slices instead of loading all rows into memory. With a job_key, REST batches are recorded
+        in a journal in output_dir and a rerun with the same key resumes after the finished batches.
+        """
         try:
-            # Load data through REST API
+            data = self._ingest_source(data, input_file)
+            if method == 'auto':
+                method = self._choose_method(data, batch_size)
+            # Load data through REST API (batches are sent concurrently when max_workers > 1)
             if method == 'rest':
-                results = []
-                for batch in batched(data.to_dicts(), batch_size):
-                    # Prepare batched records for load
-                    records = [{"attributes": {"type": sobject}, **record} for record in batch]
-                    composite_body = {"allOrNone": all_or_none, "records": records}
-                    # Upsert or Insert method using REST API
-                    if upsert_key:
-                        url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects/{sobject}/{upsert_key}"
-                        response = requests.patch(url=url, headers=self.headers, json=composite_body)
-                    else:
-                        url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects"
-                        response = requests.post(url=url, headers=self.headers, json=composite_body)
-                    response.raise_for_status()
-                    batch_results = response.json()
-                    # Join Fields to results
-                    for i, result in enumerate(batch_results):
-                        for key, value in batch[i].items():
-                            result[key] = value
-                    results.extend(batch_results)
-                return pl.DataFrame(results)
+                # Upsert or Insert method using REST API
+                if upsert_key:
+                    url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects/{sobject}/{upsert_key}"
+                    send = partial(self._send_composite, 'PATCH', url, sobject, all_or_none, _UPSERT_RESULT_SCHEMA)
+                else:
+                    url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects"
+                    send = partial(self._send_composite, 'POST', url, sobject, all_or_none, _COMPOSITE_RESULT_SCHEMA)
+                return self._run_batches(send, data, batch_size, max_workers, job_key, output_dir)
             
             # Load data through Bulk2 API (Insert or Upsert)
             elif method == 'bulk2':
-                if upsert_key:
-                    results = getattr(self.sf.bulk2, sobject).upsert(
-                        csv_file=input_file, records=data.to_dicts(), external_id_field=upsert_key
-                    )
-                else:
-                    results = getattr(self.sf.bulk2, sobject).insert(
-                        csv_file=input_file, records=data.to_dicts()
-                    )
+                operation = Operation.upsert if upsert_key else Operation.insert
+                results = self._bulk2_ingest(sobject, operation, data, upsert_key)
                 df = self._result_handler(results, to_dataframe, output_dir, sobject, ingest=True)
                 if to_dataframe:
                     return df
+            else:
+                raise ValueError(f"Invalid load method: {method}. Use 'auto', 'rest' or 'bulk2'")
         except Exception as e:
             logger.exception("Failed to execute Salesforce create")
             raise RuntimeError(f"Failed to execute Salesforce create: {str(e)}")
+        finally:
+            # Written records make cached query results of the sObject stale
+            self.invalidate_cache(sobject)
         
     def read(self, 
              soql: str, 
              method: str = 'rest', 
              to_dataframe: bool = True, 
-             output_dir: str | None='results') -> pl.DataFrame:
-        """Execute a SOQL query using REST or Bulk2 API and return a Polars DataFrame."""
+             output_dir: str | None='results',
+             page_size: int = 50000) -> pl.DataFrame:
+        """Execute a SOQL query using REST or Bulk2 API and return a Polars DataFrame.
+
+        When the connector has a cache_dir, DataFrame results are served from and stored in the
+        on-disk result cache.
+        """
         try:
-            # Query REST, Parse out attributes (Type and URL) and convert to Polars DataFrame
+            sobject = self._get_sobject_from_query(soql)
+            cache_key = self._result_cache.key(soql, method) if self._result_cache and to_dataframe else None
+            if cache_key:
+                df = self._result_cache.get(sobject, cache_key)
+                if df is not None:
+                    logger.info(f"Serving cached results for query: {soql}")
+                    return df
+
+            # Query REST page by page, Parse out attributes (Type and URL) and concatenate the pages
             if method == 'rest':
-                results = self.sf.query_all(soql)['records']
-                df = pl.DataFrame(results)
-                if 'attributes' in df.columns:
-                    df = df.with_columns([
-                        pl.col('attributes').struct.field('type').alias('sf_type'),
-                        pl.col('attributes').struct.field('url').alias('sf_url')
-                    ]).drop('attributes')
-                if not results:
+                frames = list(self._query_pages(soql))
+                if not frames:
                     logger.info(f"No data found for query: {soql}")
-                    return pl.DataFrame()
-                return df
+                    df = pl.DataFrame()
+                else:
+                    df = pl.concat(frames, how='diagonal_relaxed')
             
             # Query Bulk2 return as CSV or Dataframe
             elif method == 'bulk2':
-                sobject = self._get_sobject_from_query(soql)
-                results = getattr(self.sf.bulk2, sobject).query(
-                    soql, max_records=50000, column_delimiter="COMMA", line_ending="LF"
-                )
+                results = self._bulk2_query_pages(soql, page_size)
                 df = self._result_handler(results, to_dataframe, output_dir, sobject, ingest=False)
-                if to_dataframe:
-                    return df
+                if not to_dataframe:
+                    return
             else:
                 raise ValueError(f"Invalid query method: {method}. Use 'rest' or 'bulk2'")
+
+            if cache_key:
+                self._result_cache.put(sobject, cache_key, df)
+            return df
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce query")
+            raise RuntimeError(f"Failed to execute Salesforce query: {str(e)}")
+
+    def invalidate_cache(self, sobject: str | None = None) -> None:
+        """Drop cached query results for one sObject, or the whole result cache."""
+        if self._result_cache:
+            self._result_cache.invalidate(sobject)
+
+    def read_iter(self, 
+                  soql: str, 
+                  page_size: int | None = None, 
+                  include_deleted: bool = False,
+                  sink: str | None = None, 
+                  sink_format: str = 'parquet') -> Iterator[pl.DataFrame]:
+        """Stream a SOQL query through the REST API, yielding one DataFrame per page (or per page_size rows).
+
+        When a sink directory is given, every yielded frame is also written there as a numbered
+        Parquet or IPC part, so peak memory stays at a single page regardless of result size.
+        """
+        if sink_format not in ('parquet', 'ipc'):
+            raise ValueError(f"Invalid sink format: {sink_format}. Use 'parquet' or 'ipc'")
+        try:
+            if sink:
+                os.makedirs(sink, exist_ok=True)
+            for i, df in enumerate(self._query_pages(soql, page_size, include_deleted)):
+                if sink and sink_format == 'parquet':
+                    df.write_parquet(os.path.join(sink, f"part-{i+1:05d}.parquet"))
+                elif sink:
+                    df.write_ipc(os.path.join(sink, f"part-{i+1:05d}.arrow"))
+                yield df
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce query")
+            raise RuntimeError(f"Failed to execute Salesforce query: {str(e)}")
+
+    def sink_bulk2(self, 
+                   soql: str, 
+                   output_dir: str = 'results', 
+                   page_size: int = 50000, 
+                   include_deleted: bool = False, 
+                   chunks: int = 1, 
+                   chunk_field: str = 'Id', 
+                   max_workers: int = 4, 
+                   max_retries: int = 2) -> pl.LazyFrame:
+        """Stream a Bulk2 query into a Parquet dataset, one part per locator page, and scan it lazily.
+
+        Each page is downloaded as bytes and parsed straight into a DataFrame typed by the sObject
+        describe, so neither the raw CSV text nor more than one page is held in memory. Parts and chunk
+        directories left in output_dir by an earlier run are removed first.
+
+        With chunks > 1 the query is split into ranges of chunk_field (Id or a datetime field such as
+        CreatedDate) whose boundaries come from the field's min and max, and the ranges run as concurrent
+        Bulk2 jobs writing to chunk-NNNNN subdirectories. A failed chunk is retried on its own; the row
+        total is checked against a COUNT() taken up front and duplicate Ids are dropped from the scan.
+        """
+        try:
+            sobject = self._get_sobject_from_query(soql)
+            schema = self._describe_schema(sobject)
+            if chunks <= 1:
+                self._clear_sink(output_dir)
+                parts, _ = self._sink_bulk2_pages(soql, output_dir, schema, page_size, include_deleted)
+                if not parts:
+                    logger.info(f"No data found for query: {soql}")
+                    return pl.LazyFrame()
+                return pl.scan_parquet(parts)
+
+            _check_chunkable(soql)
+            where = _soql_where(soql)
+            expected = self._estimate_count(sobject, where, include_deleted)
+            boundaries = self._chunk_boundaries(sobject, where, schema, chunk_field, chunks)
+            queries = [_chunk_query(soql, condition) for condition in _chunk_conditions(chunk_field, boundaries)]
+            self._clear_sink(output_dir)
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries)))) as executor:
+                futures = [
+                    executor.submit(self._sink_bulk2_chunk, query, os.path.join(output_dir, f"chunk-{n:05d}"),
+                                    schema, page_size, include_deleted, max_retries)
+                    for n, query in enumerate(queries)
+                ]
+                counts = [future.result() for future in futures]
+            parts = [part for chunk_parts, _ in counts for part in chunk_parts]
+            if not parts:
+                logger.info(f"No data found for query: {soql}")
+                return pl.LazyFrame()
+
+            rows = sum(rows for _, rows in counts)
+            if rows != expected:
+                logger.warning(f"Chunked extraction of {sobject} wrote {rows} rows but COUNT() returned {expected}")
+            lf = pl.scan_parquet(parts)
+            key = next((name for name in lf.collect_schema().names() if name.lower() == 'id'), None)
+            if key is not None:
+                unique = lf.select(pl.col(key).n_unique()).collect().item()
+                if unique != rows:
+                    logger.warning(f"Dropping {rows - unique} duplicate {sobject} rows from chunked extraction")
+                    lf = lf.unique(subset=key, keep='any', maintain_order=True)
+            return lf
         except Exception as e:
             logger.exception("Failed to execute Salesforce query")
             raise RuntimeError(f"Failed to execute Salesforce query: {str(e)}")
 
+    def sync(self, 
+             sobject: str, 
+             mirror_dir: str = 'mirror', 
+             fields: list[str] | None = None, 
+             watermark_field: str = 'SystemModstamp', 
+             method: str = 'auto', 
+             lazy: bool = False) -> pl.DataFrame | pl.LazyFrame:
+        """Incrementally sync an sObject into a local Parquet mirror and return the up-to-date rows.
+
+        The first run loads every row. Later runs query only rows whose watermark_field is at or after
+        the stored watermark, including deleted rows through queryAll, and merge them into the mirror
+        with a keyed upsert on Id. Deletions are only visible while the records are in the recycle bin.
+        """
+        try:
+            schema = self._describe_schema(sobject)
+            fields = list(dict.fromkeys(['Id', watermark_field, *(fields or schema)]))
+            mirror_path = os.path.join(mirror_dir, f"{sobject}.parquet")
+            state_path = os.path.join(mirror_dir, f"{sobject}.watermark.json")
+            watermark = None
+            if os.path.exists(mirror_path) and os.path.exists(state_path):
+                with open(state_path) as f:
+                    watermark = json.load(f)[watermark_field]
+
+            # Query the changes since the watermark (IsDeleted is only selectable through queryAll)
+            if watermark:
+                where = f" WHERE {watermark_field} >= {watermark}"
+                soql = f"SELECT {', '.join(dict.fromkeys([*fields, 'IsDeleted']))} FROM {sobject}{where}"
+            else:
+                where = ''
+                soql = f"SELECT {', '.join(fields)} FROM {sobject}"
+            if method == 'auto':
+                method = 'bulk2' if self._estimate_count(sobject, where) > _BULK2_ROW_THRESHOLD else 'rest'
+            include_deleted = watermark is not None
+            if method == 'rest':
+                dfs = list(self._query_pages(soql, include_deleted=include_deleted))
+            else:
+                dfs = [
+                    self._apply_schema(pl.read_csv(page, infer_schema=False), schema)
+                    for page in self._bulk2_query_pages(soql, include_deleted=include_deleted) if page.strip()
+                ]
+            logger.info(f"Synced {sum(df.height for df in dfs)} changed {sobject} rows through {method}: {soql}")
+
+            if dfs:
+                changes = pl.concat(dfs, how='diagonal_relaxed')
+                upserts = changes.filter(~pl.col('IsDeleted')) if 'IsDeleted' in changes.columns else changes
+                upserts = upserts.select(fields)
+                os.makedirs(mirror_dir, exist_ok=True)
+                if watermark:
+                    merged = pl.concat([
+                        pl.scan_parquet(mirror_path).join(changes.lazy().select('Id'), on='Id', how='anti'),
+                        upserts.lazy()
+                    ], how='diagonal_relaxed')
+                else:
+                    merged = upserts.lazy()
+                merged.sink_parquet(f"{mirror_path}.tmp")
+                os.replace(f"{mirror_path}.tmp", mirror_path)
+                latest = changes[watermark_field].max()
+                with open(state_path, "w") as f:
+                    json.dump({watermark_field: _soql_literal(latest)}, f)
+            elif not os.path.exists(mirror_path):
+                return pl.LazyFrame() if lazy else pl.DataFrame()
+
+            lf = pl.scan_parquet(mirror_path)
+            return lf if lazy else lf.collect()
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce sync")
+            raise RuntimeError(f"Failed to execute Salesforce sync: {str(e)}")
+
+    def push(self, 
+             sobject: str, 
+             data: pl.DataFrame, 
+             key: str, 
+             index_dir: str = 'hash_index', 
+             delete_missing: bool = False, 
+             method: str = 'auto', 
+             batch_size: int | None = 200, 
+             max_workers: int = 1) -> pl.DataFrame:
+        """Write only the rows that changed since the last push, upserting on key (or updating when key is Id).
+
+        A per-key index of row hashes (polars hash_rows, so it is rebuilt after a polars upgrade) is
+        kept in index_dir and compared with the incoming frame, so only new and changed rows are sent.
+        With delete_missing, keys that vanished from the frame are deleted by their Salesforce Id.
+        The index only takes in rows Salesforce confirmed, so failed rows are sent again next time.
+        """
+        try:
+            index_path = os.path.join(index_dir, f"{sobject}.{key}.parquet")
+            if os.path.exists(index_path):
+                index = pl.read_parquet(index_path)
+            else:
+                index = pl.DataFrame(schema={key: data.schema[key], '_hash': pl.UInt64, 'Id': pl.String})
+            hashed = data.with_columns(data.select(sorted(data.columns)).hash_rows().alias('_hash'))
+            changed = hashed.join(index.select(key, '_hash'), on=[key, '_hash'], how='anti')
+            logger.info(f"Pushing {changed.height} of {data.height} {sobject} rows that changed since the last push")
+
+            results = []
+            if changed.height:
+                if key == 'Id':
+                    written = self.update(sobject, data=changed.drop('_hash'), method=method, 
+                                          batch_size=batch_size, max_workers=max_workers)
+                else:
+                    written = self.create(sobject, data=changed.drop('_hash'), method=method, upsert_key=key, 
+                                          batch_size=batch_size, max_workers=max_workers)
+                confirmed = self._confirmed(written, key, data.schema[key])
+                entries = changed.select(key, '_hash').join(confirmed, on=key)
+                index = pl.concat([index.join(entries.select(key), on=key, how='anti'), entries], how='vertical_relaxed')
+                results.append(written)
+
+            if delete_missing:
+                vanished = index.join(data.select(key), on=key, how='anti').filter(pl.col('Id').is_not_null())
+                if vanished.height:
+                    logger.info(f"Deleting {vanished.height} {sobject} rows whose {key} is no longer pushed")
+                    deleted = self.delete(sobject, data=vanished.select('Id'), method=method, 
+                                          batch_size=batch_size, max_workers=max_workers)
+                    removed = self._confirmed(deleted, 'Id', pl.String)
+                    index = index.join(removed, on='Id', how='anti')
+                    results.append(deleted)
+
+            os.makedirs(index_dir, exist_ok=True)
+            index.unique(subset=key, keep='last').write_parquet(f"{index_path}.tmp")
+            os.replace(f"{index_path}.tmp", index_path)
+            return pl.concat(results, how='diagonal_relaxed') if results else pl.DataFrame()
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce push")
+            raise RuntimeError(f"Failed to execute Salesforce push: {str(e)}")
+
+    @staticmethod
+    def _confirmed(results: pl.DataFrame, key: str, dtype: pl.DataType) -> pl.DataFrame:
+        """Return the key and Salesforce Id of the rows a REST or Bulk2 write reports as successful."""
+        if 'status' in results.columns:
+            ok, record_id = pl.col('status') == 'success', pl.col('sf__Id')
+        else:
+            ok, record_id = pl.col('success'), pl.col('id')
+        selected = [pl.col(key).cast(dtype, strict=False)]
+        if key != 'Id':
+            selected.append(record_id.cast(pl.String).alias('Id'))
+        return results.filter(ok).select(selected)
+
     def update(self, 
                sobject: str, 
-               data: pl.DataFrame = None, 
+               data: pl.DataFrame | pl.LazyFrame = None, 
                input_file: str = None,
                method: str = 'rest', 
                to_dataframe: bool = True, 
                output_dir: str | None = 'results',
-               batch_size: int = 200, 
-               all_or_none: bool = False) -> pl.DataFrame:
+               batch_size: int | None = 200, 
+               all_or_none: bool = False,
+               max_workers: int = 1,
+               job_key: str | None = None) -> pl.DataFrame:
         """Execute a Batched REST or Bulk - Update operation."""
         try:
-            # Update data through REST API
+            data = self._ingest_source(data, input_file)
+            if method == 'auto':
+                method = self._choose_method(data, batch_size)
+            # Update data through REST API (batches are sent concurrently when max_workers > 1)
             if method == 'rest':
-                results = []
-                for batch in batched(data.to_dicts(), batch_size):
-                    # Prepare batched records for update
-                    records = [{"attributes": {"type": sobject}, **record} for record in batch]
-                    composite_body = {"allOrNone": all_or_none, "records": records}
-                    url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects/"
-                    response = requests.patch(url=url, headers=self.headers, json=composite_body)
-                    response.raise_for_status()
-                    batch_results = response.json()
-                    # Join Fields to results
-                    for i, result in enumerate(batch_results):
-                        for key, value in batch[i].items():
-                            result[key] = value
-                    results.extend(batch_results)
-                return pl.DataFrame(results)
+                url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects/"
+                send = partial(self._send_composite, 'PATCH', url, sobject, all_or_none, _COMPOSITE_RESULT_SCHEMA)
+                return self._run_batches(send, data, batch_size, max_workers, job_key, output_dir)
             
             # Update data through Bulk2 API
             elif method == 'bulk2':
-                results = getattr(self.sf.bulk2, sobject).update(csv_file=input_file, records=data.to_dicts())
+                results = self._bulk2_ingest(sobject, Operation.update, data)
                 df = self._result_handler(results, to_dataframe, output_dir, sobject, ingest=True)
                 if to_dataframe:
                     return df
+            else:
+                raise ValueError(f"Invalid load method: {method}. Use 'auto', 'rest' or 'bulk2'")
         except Exception as e:
             logger.exception("Failed to execute Salesforce update")
             raise RuntimeError(f"Failed to execute Salesforce update: {str(e)}")
+        finally:
+            # Written records make cached query results of the sObject stale
+            self.invalidate_cache(sobject)
 
     def delete(self, 
                sobject: str, 
-               data: pl.DataFrame = None, 
+               data: pl.DataFrame | pl.LazyFrame = None, 
                input_file: str = None,
                method: str = 'rest', 
                to_dataframe: bool = True, 
                output_dir: str | None = 'results',
-               batch_size: int = 200, 
-               all_or_none: bool = False) -> pl.DataFrame:
+               batch_size: int | None = 200, 
+               all_or_none: bool = False,
+               max_workers: int = 1,
+               job_key: str | None = None) -> pl.DataFrame:
         """Execute a Batched REST or Bulk - Delete operation."""
         try:
-            # Delete data through REST API
+            data = self._ingest_source(data, input_file).select('Id')
+            if method == 'auto':
+                method = self._choose_method(data, batch_size)
+            # Delete data through REST API (batches are sent concurrently when max_workers > 1)
             if method == 'rest':
-                results = []
-                ids = data.select('Id').to_series().to_list()
-                for batch in batched(ids, batch_size):
-                    # Prepare batched records for delete
-                    url = self._build_delete_url(batch) + f"&allOrNone={str(all_or_none).lower()}"
-                    response = requests.delete(url=url, headers=self.headers)
-                    response.raise_for_status()
-                    batch_results = response.json()
-                    # Join Fields to results
-                    for i, result in enumerate(batch_results):
-                        result['Id'] = batch[i]
-                    results.extend(batch_results)
-                return pl.DataFrame(results)
+                send = partial(self._send_delete, all_or_none)
+                return self._run_batches(send, data, batch_size, max_workers, job_key, output_dir)
             
-            # Delete data through Bulk2 API (Dataframe not natively supported in simple_salesforce bulk2 delete)
+            # Delete data through Bulk2 API
             elif method == 'bulk2':
-                if data is not None:
-                    from tempfile import NamedTemporaryFile
-                    # Create a named temporary file that will be deleted when closed
-                    with NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as tmp:
-                        # Write DataFrame directly to the temporary file
-                        data.select(['Id']).write_csv(tmp.name, include_header=True)
-                        # Use the temporary file for the delete operation
-                        results = getattr(self.sf.bulk2, sobject).delete(csv_file=tmp.name)
-                    # Clean up the temporary file
-                    import os
-                    os.unlink(tmp.name)
-                elif input_file is not None:
-                    results = getattr(self.sf.bulk2, sobject).delete(csv_file=input_file)
-                else:
-                    raise ValueError("Either data or input_file must be provided")
+                results = self._bulk2_ingest(sobject, Operation.delete, data)
                 df = self._result_handler(results, to_dataframe, output_dir, sobject, ingest=True)
                 if to_dataframe:
                     return df
+            else:
+                raise ValueError(f"Invalid load method: {method}. Use 'auto', 'rest' or 'bulk2'")
         except Exception as e:
             logger.exception("Failed to execute Salesforce delete")
             raise RuntimeError(f"Failed to execute Salesforce delete: {str(e)}")
+        finally:
+            # Written records make cached query results of the sObject stale
+            self.invalidate_cache(sobject)
+
+    def _query_pages(self, 
+                     soql: str, 
+                     page_size: int | None = None, 
+                     include_deleted: bool = False) -> Iterator[pl.DataFrame]:
+        """Follow nextRecordsUrl and yield the records as typed DataFrames, re-chunked to page_size if given."""
+        sobject = self._get_sobject_from_query(soql)
+        schema = self._query_schema(sobject)
+        with self._span('salesforce.page', sobject=sobject, api='rest') as span:
+            result = self.sf.query(soql, include_deleted=include_deleted)
+            if span is not None:
+                span['rows'] = len(result['records'])
+        buffer = []
+        while True:
+            buffer.extend(result['records'])
+            while buffer and (page_size is None or len(buffer) >= page_size):
+                cut = len(buffer) if page_size is None else page_size
+                yield self._records_to_frame(buffer[:cut], schema)
+                buffer = buffer[cut:]
+            if result['done']:
+                break
+            with self._span('salesforce.page', sobject=sobject, api='rest') as span:
+                result = self.sf.query_more(result['nextRecordsUrl'], identifier_is_url=True, 
+                                            include_deleted=include_deleted)
+                if span is not None:
+                    span['rows'] = len(result['records'])
+        if buffer:
+            yield self._records_to_frame(buffer, schema)
+
+    @classmethod
+    def _records_to_frame(cls, records: list[dict], schema: dict[str, pl.DataType]) -> pl.DataFrame:
+        """Convert REST query records to a typed DataFrame, parsing out attributes (Type and URL)."""
+        # Described fields are read with their JSON types, temporal fields as strings to be parsed below
+        overrides = {
+            name: pl.String if dtype.is_temporal() else dtype
+            for name, dtype in schema.items() if name in records[0]
+        }
+        df = cls._apply_schema(pl.DataFrame(records, schema_overrides=overrides), schema)
+        if 'attributes' in df.columns:
+            df = df.with_columns([
+                pl.col('attributes').struct.field('type').alias('sf_type'),
+                pl.col('attributes').struct.field('url').alias('sf_url')
+            ]).drop('attributes')
+        return df
+
+    def api_limits(self) -> dict:
+        """Read the org limits from the /limits endpoint, e.g. DailyApiRequests and DailyBulkV2QueryJobs."""
+        try:
+            return self.sf.limits()
+        except Exception as e:
+            logger.exception("Failed to read Salesforce limits")
+            raise RuntimeError(f"Failed to read Salesforce limits: {str(e)}")
+
+    @property
+    def api_usage(self) -> tuple[int, int] | None:
+        """Daily API requests used and allowed, as last reported by a Sforce-Limit-Info response header."""
+        return self._limiter.api_usage
+
+    def submit_bulk2(self, 
+                     sobject: str, 
+                     data: pl.DataFrame, 
+                     operation: str = 'insert', 
+                     upsert_key: str | None = None) -> 'Bulk2Job':
+        """Upload rows to Bulk2 ingest jobs and return a handle without waiting for Salesforce to process them.
+
+        operation is one of 'insert', 'upsert', 'update', 'delete' or 'hardDelete'. Handles of
+        independent loads can be awaited together with wait_all so the jobs overlap.
+        """
+        try:
+            operation = Operation(operation)
+            if operation in (Operation.query, Operation.query_all):
+                raise ValueError(f"Invalid ingest operation: {operation.value}")
+            if operation == Operation.upsert and not upsert_key:
+                raise ValueError("upsert_key is required for upsert")
+            if operation in (Operation.delete, Operation.hard_delete):
+                data = data.select('Id')
+            return self._bulk2_submit(sobject, operation, data, upsert_key)
+        except Exception as e:
+            logger.exception("Failed to submit Salesforce Bulk2 job")
+            raise RuntimeError(f"Failed to submit Salesforce Bulk2 job: {str(e)}")
+
+    def clear_describe_cache(self, sobject: str | None = None) -> None:
+        """Drop cached describe metadata for one sObject, or for all of them."""
+        with self._describe_lock:
+            if sobject:
+                self._describe_cache.pop(sobject.lower(), None)
+            else:
+                self._describe_cache.clear()
+        if self.describe_cache_dir and os.path.isdir(self._describe_cache_path()):
+            names = [f"{sobject.lower()}.json"] if sobject else os.listdir(self._describe_cache_path())
+            for name in names:
+                path = os.path.join(self._describe_cache_path(), name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _describe_schema(self, sobject: str) -> dict[str, pl.DataType]:
+        """Map the queryable fields of an sObject to a Polars schema."""
+        fields = self._describe_fields(sobject)
+        return {name: _FIELD_TYPES[field_type] for name, field_type in fields.items() if field_type in _FIELD_TYPES}
+
+    def _query_schema(self, sobject: str) -> dict[str, pl.DataType]:
+        """Schema to type query results by, or an empty one (untyped results) when the describe fails."""
+        try:
+            return self._describe_schema(sobject)
+        except Exception as e:
+            logger.warning(f"Could not describe {sobject}, returning untyped query results: {e}")
+            return {}
+
+    def _describe_fields(self, sobject: str) -> dict[str, str]:
+        """Return the field types of an sObject from the describe cache, describing it on a miss."""
+        key = sobject.lower()
+        with self._describe_lock:
+            if key in self._describe_cache:
+                return self._describe_cache[key]
+        path = os.path.join(self._describe_cache_path(), f"{key}.json") if self.describe_cache_dir else None
+        if path and os.path.exists(path) and time.time() - os.path.getmtime(path) < self.describe_cache_ttl:
+            with open(path) as f:
+                fields = json.load(f)
+        else:
+            fields = {field['name']: field['type'] for field in getattr(self.sf, sobject).describe()['fields']}
+            if path:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(f"{path}.tmp", "w") as f:
+                    json.dump(fields, f)
+                os.replace(f"{path}.tmp", path)
+        with self._describe_lock:
+            self._describe_cache[key] = fields
+        return fields
+
+    def _describe_cache_path(self) -> str:
+        """Directory of the on-disk describe cache for this org and API version."""
+        return os.path.join(self.describe_cache_dir, self.sf.sf_instance, f"v{self.version}")
+
+    def _estimate_count(self, sobject: str, where: str = '', include_deleted: bool = False) -> int:
+        """Estimate the number of rows a query returns with a cheap COUNT() query."""
+        return self.sf.query(f"SELECT COUNT() FROM {sobject}{where}", include_deleted=include_deleted)['totalSize']
+
+    def _chunk_boundaries(self, 
+                          sobject: str, 
+                          where: str, 
+                          schema: dict[str, pl.DataType], 
+                          chunk_field: str, 
+                          chunks: int) -> list[str]:
+        """Split the range of chunk_field into evenly spaced SOQL literals using its min and max values."""
+        dtype = next((dtype for name, dtype in schema.items() if name.lower() == chunk_field.lower()), None)
+        if chunk_field.lower() != 'id' and not isinstance(dtype, pl.Datetime):
+            raise ValueError(f"Cannot chunk on {chunk_field}: expected Id or a datetime field")
+        bounds = []
+        for direction in ('ASC', 'DESC'):
+            records = self.sf.query(
+                f"SELECT {chunk_field} FROM {sobject}{where} ORDER BY {chunk_field} {direction} NULLS LAST LIMIT 1"
+            )['records']
+            if not records or records[0][chunk_field] is None:
+                return []
+            bounds.append(records[0][chunk_field])
+        if chunk_field.lower() == 'id':
+            low, high = (_id_to_int(value) for value in bounds)
+            values = [_int_to_id(low + (high - low) * n // chunks) for n in range(1, chunks)]
+        else:
+            low, high = (datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z') for value in bounds)
+            values = [(low + (high - low) * n / chunks).replace(microsecond=0) for n in range(1, chunks)]
+        # Narrow ranges can produce repeated boundaries, which would only add empty chunks
+        return list(dict.fromkeys(_soql_literal(value) for value in values))
+
+    @staticmethod
+    def _apply_schema(df: pl.DataFrame, schema: dict[str, pl.DataType]) -> pl.DataFrame:
+        """Cast query results to the sObject schema, parsing Salesforce date/time strings."""
+        # SOQL field names are case-insensitive, so match columns the same way
+        dtypes = {name.lower(): dtype for name, dtype in schema.items()}
+        columns = []
+        for name in df.columns:
+            dtype = dtypes.get(name.lower())
+            if dtype is None or df.schema[name] == dtype:
+                continue
+            if df.schema[name] != pl.String:
+                columns.append(pl.col(name).cast(dtype, strict=False))
+                continue
+            # Bulk2 CSV writes nulls as empty strings
+            value = pl.when(pl.col(name) != '').then(pl.col(name))
+            if dtype == pl.Date:
+                columns.append(value.str.to_date('%Y-%m-%d').alias(name))
+            elif isinstance(dtype, pl.Datetime):
+                # REST returns +0000 offsets and Bulk2 returns a Z suffix
+                columns.append(
+                    value.str.replace('Z$', '+0000')
+                    .str.to_datetime('%Y-%m-%dT%H:%M:%S%.f%z', time_unit=dtype.time_unit)
+                    .dt.convert_time_zone(dtype.time_zone).alias(name)
+                )
+            elif dtype == pl.Time:
+                columns.append(value.str.to_time('%H:%M:%S%.fZ').alias(name))
+            elif dtype == pl.Boolean:
+                columns.append(value.str.to_lowercase().replace_strict({'true': True, 'false': False}, default=None,
+                                                                       return_dtype=pl.Boolean).alias(name))
+            else:
+                columns.append(value.cast(dtype, strict=False).alias(name))
+        return df.with_columns(columns) if columns else df
+
+    def _bulk2_query_pages(self, 
+                           soql: str, 
+                           page_size: int = 50000, 
+                           include_deleted: bool = False) -> Iterator[bytes]:
+        """Run a Bulk2 query job and yield each locator page of CSV results as raw bytes."""
+        sobject = self._get_sobject_from_query(soql)
+        operation = Operation.query_all if include_deleted else Operation.query
+        # The job span covers the time Salesforce spends running the query
+        with self._span('salesforce.bulk2.job', sobject=sobject, operation=operation.value) as span:
+            job = self._with_session(
+                lambda: self._bulk2_client(sobject).create_job(operation, soql, ColumnDelimiter.COMMA, LineEnding.LF)
+            )
+            if span is not None:
+                span['job_id'] = job['id']
+            self._with_session(lambda: self._bulk2_client(sobject).wait_for_job(job['id'], True))
+        url = f"{self.sf.bulk2_url}query/{job['id']}/results"
+        headers = {**self.headers, "Accept": "text/csv"}
+        params = {"maxRecords": page_size}
+        while True:
+            with self._span('salesforce.page', sobject=sobject, api='bulk2', job_id=job['id']) as span:
+                response = self._request(self.session.get, url, headers=headers, params=params, 
+                                         timeout=self.timeout, stream=True)
+                response.raise_for_status()
+                # Read the body once; polars parses NUL bytes inside values, so unlike
+                # simple_salesforce no stripped copy of the page is made
+                page = response.content
+                if span is not None:
+                    span.update(rows=int(response.headers.get('Sforce-NumberOfRecords', 0)), 
+                                    bytes_received=len(page))
+            yield page
+            locator = response.headers.get('Sforce-Locator')
+            if not locator or locator == 'null':
+                break
+            params = {"maxRecords": page_size, "locator": locator}
+
+    def _sink_bulk2_pages(self, 
+                          soql: str, 
+                          output_dir: str, 
+                          schema: dict[str, pl.DataType], 
+                          page_size: int, 
+                          include_deleted: bool) -> tuple[list[str], int]:
+        """Write each Bulk2 result page to its own Parquet part and return the part paths and row count."""
+        os.makedirs(output_dir, exist_ok=True)
+        parts = []
+        rows = 0
+        for page in self._bulk2_query_pages(soql, page_size, include_deleted):
+            if not page.strip():
+                continue
+            df = self._apply_schema(pl.read_csv(page, infer_schema=False), schema)
+            rows += df.height
+            parts.append(os.path.join(output_dir, f"part-{len(parts) + 1:05d}.parquet"))
+            df.write_parquet(parts[-1])
+        return parts, rows
+
+    def _sink_bulk2_chunk(self, 
+                          soql: str, 
+                          output_dir: str, 
+                          schema: dict[str, pl.DataType], 
+                          page_size: int, 
+                          include_deleted: bool, 
+                          max_retries: int) -> tuple[list[str], int]:
+        """Extract one chunk, rerunning its Bulk2 job from scratch on failure."""
+        for attempt in range(max_retries + 1):
+            # Clear parts left behind by a failed attempt so they are not counted twice
+            shutil.rmtree(output_dir, ignore_errors=True)
+            try:
+                return self._sink_bulk2_pages(soql, output_dir, schema, page_size, include_deleted)
+            except Exception:
+                if attempt == max_retries:
+                    raise
+                logger.warning(f"Bulk2 chunk failed, retrying ({attempt + 1}/{max_retries}): {soql}", exc_info=True)
+                time.sleep(2 ** attempt)
+
+    @staticmethod
+    def _clear_sink(output_dir: str) -> None:
+        """Remove the parts and chunk directories an earlier sink_bulk2 run left in output_dir."""
+        for path in glob.glob(os.path.join(output_dir, 'part-*.parquet')):
+            os.remove(path)
+        for path in glob.glob(os.path.join(output_dir, 'chunk-*')):
+            shutil.rmtree(path, ignore_errors=True)
 
     def _get_sobject_from_query(self, soql: str) -> str:
-        match = re.search(r'FROM\s+(\w+)', soql, re.IGNORECASE)
+        match = _top_level_from(soql)
         if not match:
             raise ValueError("Could not determine object from query")
         return match.group(1)
@@ -210,63 +810,1207 @@ class Salesforce(BaseConnector):
                         sobject: str,
                         ingest: bool) -> pl.DataFrame:
         """Returns a DataFrame or writes results to CSV files based on the ingest flag."""
+        if ingest:
+            return self._ingest_output(self._ingest_results(results), to_dataframe, output_dir)
         if to_dataframe:
-            if ingest:
-                for result in results:
-                    job_id = result['job_id']
-                    # Get successful, failed, and unprocessed records
-                    success_df = getattr(self.sf.bulk2, sobject).get_successful_records(job_id)
-                    failed_df = getattr(self.sf.bulk2, sobject).get_failed_records(job_id)
-                    unprocessed_df = getattr(self.sf.bulk2, sobject).get_unprocessed_records(job_id)
-
-                    # Read CSVs into DataFrames and add a status column
-                    success = pl.read_csv(io.StringIO(success_df)).with_columns(pl.lit("success").alias("status"))
-                    failed = pl.read_csv(io.StringIO(failed_df)).with_columns(pl.lit("failed").alias("status"))
-                    unprocessed = pl.read_csv(io.StringIO(unprocessed_df)).with_columns(pl.lit("unprocessed").alias("status"))
-
-                    df = pl.concat([success, failed, unprocessed], how="diagonal")
-                    return df
-            else:
-                dfs = [pl.read_csv(io.StringIO(csv_str)) for csv_str in results]
-                return pl.concat(dfs)
+            schema = self._query_schema(sobject)
+            dfs = [self._apply_schema(pl.read_csv(page, infer_schema=False), schema) for page in results if page.strip()]
+            if not dfs:
+                return pl.DataFrame()
+            return pl.concat(dfs, how='diagonal_relaxed')
         else:
-            if ingest:
-                for result in results:
-                    job_id = result['job_id']
-                    combined_csv = ""
-                    status_labels = ["success", "failed", "unprocessed"]
-
-                    # Get successful, failed, and unprocessed records and write to CSV
-                    for idx, (csv_str, status) in enumerate(zip([
-                        getattr(self.sf.bulk2, sobject).get_successful_records(job_id),
-                        getattr(self.sf.bulk2, sobject).get_failed_records(job_id),
-                        getattr(self.sf.bulk2, sobject).get_unprocessed_records(job_id)
-                    ], status_labels)):
-                        if csv_str.strip():
-                            lines = csv_str.splitlines()
-                            if len(lines) == 0:
-                                continue
-                            header = lines[0]
-                            if idx == 0:
-                                combined_csv += f'{header},"status"\n'
-                            for row in lines[1:] if idx > 0 else lines[1:]:
-                                if row.strip():
-                                    combined_csv += f'{row},"{status}"\n'
-                    if combined_csv:
-                        with open(os.path.join(output_dir, f"{job_id}_combined.csv"), "w") as f:
-                            f.write(combined_csv)
-            else:
-                os.makedirs(output_dir, exist_ok=True)
-                for i, data in enumerate(results):
-                    with open(os.path.join(output_dir, f"part-{i+1}.csv"), "w") as bos:
-                        bos.write(data)
+            os.makedirs(output_dir, exist_ok=True)
+            for i, data in enumerate(results):
+                with open(os.path.join(output_dir, f"part-{i+1}.csv"), "wb") as bos:
+                    bos.write(data)
+
+    @staticmethod
+    def _ingest_output(frames, to_dataframe: bool, output_dir: str | None) -> pl.DataFrame:
+        """Concatenate the (job_id, DataFrame) ingest results or write each job to {job_id}_combined.csv."""
+        if to_dataframe:
+            dfs = [df for _, df in frames]
+            if not dfs:
+                return pl.DataFrame()
+            return pl.concat(dfs, how='diagonal_relaxed')
+        os.makedirs(output_dir, exist_ok=True)
+        for job_id, df in frames:
+            df.write_csv(os.path.join(output_dir, f"{job_id}_combined.csv"))
 
-    def _build_delete_url(self, batch_ids: list) -> str:
+    def _ingest_results(self, results) -> Iterator[tuple[str, pl.DataFrame]]:
+        """Yield the successful, failed and unprocessed records of every Bulk2 ingest job with a status column.
+
+        The three result sets of a job are fetched concurrently as raw CSV bytes.
+        """
+        with ThreadPoolExecutor(max_workers=len(_INGEST_STATUSES)) as executor:
+            for result in results:
+                job_id = result['job_id']
+                pages = executor.map(partial(self._bulk2_ingest_page, job_id), _INGEST_STATUSES.values())
+                df = self._ingest_frame(dict(zip(_INGEST_STATUSES, pages)))
+                if df is not None:
+                    yield job_id, df
+
+    @staticmethod
+    def _ingest_frame(pages: dict[str, bytes]) -> pl.DataFrame | None:
+        """Combine the result sets of one ingest job, keyed by status, into one DataFrame."""
+        dfs = [
+            pl.read_csv(page).with_columns(pl.lit(status).alias("status"))
+            for status, page in pages.items() if page.strip()
+        ]
+        return pl.concat(dfs, how='diagonal_relaxed') if dfs else None
+
+    def _bulk2_ingest_page(self, job_id: str, results_type: str) -> bytes:
+        """Download one result set of a Bulk2 ingest job as raw CSV bytes."""
+        url = f"{self.sf.bulk2_url}ingest/{job_id}/{results_type}"
+        response = self._request(self.session.get, url, headers={**self.headers, "Accept": "text/csv"}, 
+                                 timeout=self.timeout, stream=True)
+        response.raise_for_status()
+        return response.content
+
+    def _build_delete_url(self, batch_ids: list, all_or_none: bool | None = None) -> str:
         """Build DELETE URL with comma-separated IDs."""
         ids_string = ','.join(batch_ids)
-        return f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects?ids={ids_string}"
+        url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects?ids={ids_string}"
+        return url if all_or_none is None else f"{url}&allOrNone={str(all_or_none).lower()}"
+
+    @staticmethod
+    def _build_session(pool_size: int, max_retries: int) -> requests.Session:
+        """Build a pooled session that retries idempotent verbs on transient failures."""
+        # 429 and 503 are left to _request so that they slow down the shared rate limiter
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(502, 504),
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def _run_batches(self, 
+                     send, 
+                     data: pl.DataFrame | pl.LazyFrame, 
+                     batch_size: int | None, 
+                     max_workers: int, 
+                     job_key: str | None = None, 
+                     output_dir: str | None = None) -> pl.DataFrame:
+        """Send batches through a bounded thread pool and return the results in input order.
+
+        A fixed batch_size slices the data evenly. With batch_size=None each batch is cut by the
+        _BatchSizer from the per-row payload bytes and the latency of the batches already sent.
+        With a job_key, input ranges finished by an earlier run are skipped and their journaled
+        results are returned in their place.
+        """
+        if isinstance(data, pl.LazyFrame):
+            data = data.collect()
+        with self._journal(job_key, output_dir, data) as journal:
+            finished = journal.batches() if journal else {}
+            gaps = _BatchJournal.gaps(finished, data.height)
+
+            def run(offset: int, batch: pl.DataFrame) -> pl.DataFrame:
+                df = send(batch)
+                if journal:
+                    journal.record(offset, df)
+                return df
+
+            results = {}
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                if batch_size is not None:
+                    bounds = self._batch_bounds(gaps, batch_size)
+                    dfs = executor.map(lambda bound: run(bound[0], data.slice(*bound)), bounds)
+                    results = {offset: df for (offset, _), df in zip(bounds, dfs)}
+                else:
+                    sizer = _BatchSizer(self._row_bytes(data))
+                    pending = {}
+                    while gaps or pending:
+                        while gaps and len(pending) < max_workers:
+                            start, size = self._next_batch(gaps, sizer)
+                            pending[executor.submit(self._timed, partial(run, start), data.slice(start, size))] = start
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            elapsed, df = future.result()
+                            sizer.observe(elapsed)
+                            results[pending.pop(future)] = df
+            if finished:
+                results = {**journal.load(finished), **results}
+        return self._ordered_results(results)
+
+    @staticmethod
+    def _batch_bounds(gaps: list[tuple[int, int]], batch_size: int) -> list[tuple[int, int]]:
+        """Split the unfinished input ranges into (offset, size) batches of at most batch_size rows."""
+        return [(offset, min(batch_size, end - offset)) for start, end in gaps for offset in range(start, end, batch_size)]
+
+    @staticmethod
+    def _next_batch(gaps: list[tuple[int, int]], sizer: '_BatchSizer') -> tuple[int, int]:
+        """Take the next batch sized by the _BatchSizer off the front of the unfinished ranges as (offset, size)."""
+        start, end = gaps.pop(0)
+        size = min(sizer.next_size(start), end - start)
+        if start + size < end:
+            gaps.insert(0, (start + size, end))
+        return start, size
+
+    @staticmethod
+    def _ordered_results(results: dict[int, pl.DataFrame]) -> pl.DataFrame:
+        """Concatenate the batch results keyed by input offset in input order."""
+        dfs = [results[key] for key in sorted(results)]
+        if not dfs:
+            return pl.DataFrame()
+        return pl.concat(dfs, how='vertical')
+
+    @staticmethod
+    @contextmanager
+    def _journal(job_key: str | None, output_dir: str | None, data: pl.DataFrame) -> Iterator['_BatchJournal | None']:
+        """Open the batch journal of a keyed load in output_dir, or yield None without a job_key."""
+        if not job_key:
+            yield None
+            return
+        os.makedirs(output_dir or '.', exist_ok=True)
+        journal = _BatchJournal(os.path.join(output_dir or '.', f"{job_key}.journal.sqlite"), data)
+        try:
+            yield journal
+        finally:
+            journal.close()
+
+    @staticmethod
+    def _timed(send, batch: pl.DataFrame) -> tuple[float, pl.DataFrame]:
+        """Send a batch and return its latency with the results."""
+        start = time.monotonic()
+        df = send(batch)
+        return time.monotonic() - start, df
+
+    @staticmethod
+    def _row_bytes(data: pl.DataFrame) -> pl.Series:
+        """Estimate the encoded payload size of every row."""
+        if not data.width:
+            return pl.Series('bytes', [0] * data.height, dtype=pl.UInt32)
+        return data.select(pl.struct(pl.all()).struct.json_encode().str.len_bytes().alias('bytes')).to_series()
+
+    def _choose_method(self, data: pl.DataFrame | pl.LazyFrame, batch_size: int | None) -> str:
+        """Pick composite REST or Bulk2 from row count, payload size and remaining API requests."""
+        if isinstance(data, pl.LazyFrame):
+            # Lazy sources are streamed out-of-core, which only Bulk2 does
+            logger.info("Loading a LazyFrame through bulk2")
+            return 'bulk2'
+        if data.height > _BULK2_ROW_THRESHOLD:
+            logger.info(f"Loading {data.height} rows through bulk2")
+            return 'bulk2'
+        total_bytes = self._row_bytes(data).sum() if data.height else 0
+        calls = max(-(-data.height // (batch_size or _COMPOSITE_MAX_RECORDS)), -(-total_bytes // _COMPOSITE_TARGET_BYTES))
+        remaining = self._remaining_api_requests()
+        method = 'bulk2' if remaining is not None and calls > remaining * _REST_API_BUDGET else 'rest'
+        logger.info(f"Loading {data.height} rows ({total_bytes} bytes, {calls} REST calls, "
+                    f"{remaining} API requests remaining) through {method}")
+        return method
+
+    def _remaining_api_requests(self) -> int | None:
+        """Return the remaining daily API requests of the org, or None if they can't be read."""
+        if self.api_usage is not None:
+            used, limit = self.api_usage
+            return limit - used
+        try:
+            return int(self.api_limits()['DailyApiRequests']['Remaining'])
+        except Exception:
+            logger.warning("Could not read the org API limits", exc_info=True)
+            return None
+
+    def _bulk2_ingest(self, 
+                      sobject: str, 
+                      operation: Operation, 
+                      data: pl.DataFrame, 
+                      external_id_field: str | None = None) -> list[dict]:
+        """Load a DataFrame through Bulk2 ingest jobs, one job per chunk under the upload size limit."""
+        return self._bulk2_submit(sobject, operation, data, external_id_field).wait().results
+
+    def _bulk2_submit(self, 
+                      sobject: str, 
+                      operation: Operation, 
+                      data: pl.DataFrame | pl.LazyFrame, 
+                      external_id_field: str | None = None) -> 'Bulk2Job':
+        """Create, upload and close one Bulk2 ingest job per CSV payload under the upload size limit."""
+        jobs = {}
+        for payload, rows in self._bulk2_payloads(self._ingest_batches(data)):
+            job_id = self._with_session(
+                lambda: self._bulk2_client(sobject).create_job(operation, external_id_field=external_id_field)
+            )['id']
+            client = self._bulk2_client(sobject)
+            try:
+                with self._span('salesforce.bulk2.upload', sobject=sobject, operation=operation.value, job_id=job_id, 
+                                rows=rows, bytes_sent=len(payload)):
+                    self._bulk2_upload(job_id, payload)
+                client.close_job(job_id)
+            except Exception:
+                client.abort_job(job_id, False)
+                for submitted in jobs:
+                    client.abort_job(submitted, False)
+                raise
+            jobs[job_id] = rows
+        return Bulk2Job(self, sobject, jobs)
+
+    @staticmethod
+    def _ingest_source(data: pl.DataFrame | pl.LazyFrame | None, input_file: str | None) -> pl.DataFrame | pl.LazyFrame:
+        """Return the rows to load: the given frame, or a lazy scan of a Parquet dataset or CSV file."""
+        if data is not None:
+            return data
+        if input_file is None:
+            raise ValueError("Either data or input_file must be provided")
+        if input_file.endswith('.parquet') or os.path.isdir(input_file):
+            return pl.scan_parquet(input_file)
+        # Read CSV values as written so they are uploaded unchanged
+        return pl.scan_csv(input_file, infer_schema=False)
+
+    @staticmethod
+    def _ingest_batches(data: pl.DataFrame | pl.LazyFrame) -> Iterator[pl.DataFrame]:
+        """Yield a frame to load in slices, streaming LazyFrames with the polars streaming engine."""
+        if isinstance(data, pl.LazyFrame):
+            yield from data.collect_batches(chunk_size=_BULK2_STREAM_ROWS)
+        else:
+            yield from data.iter_slices(_BULK2_STREAM_ROWS)
+
+    @classmethod
+    def _bulk2_payloads(cls, batches: Iterator[pl.DataFrame]) -> Iterator[tuple[bytes, int]]:
+        """Re-cut streamed slices into CSV payloads under the Bulk2 upload size limit.
+
+        Yields each payload with its row count. Slices are encoded straight to CSV bytes and cut at
+        row boundaries by their JSON-encoded row sizes, which bound the CSV sizes from above, so at
+        most one payload and one slice are held in memory.
+        """
+        header, parts, size, rows = None, [], 0, 0
+        for batch in batches:
+            batch = cls._serialize_datetimes(batch)
+            if header is None:
+                header = batch.head(0).write_csv().encode()
+            row_bytes = cls._row_bytes(batch)
+            offset = 0
+            while offset < batch.height:
+                budget = _BULK2_MAX_UPLOAD_BYTES - len(header) - size
+                fits = row_bytes.slice(offset).cum_sum().search_sorted(budget, side='right')
+                if not fits and rows:
+                    yield header + b''.join(parts), rows
+                    parts, size, rows = [], 0, 0
+                    continue
+                take = max(1, fits)
+                buffer = io.BytesIO()
+                batch.slice(offset, take).write_csv(buffer, include_header=False)
+                parts.append(buffer.getvalue())
+                size += row_bytes.slice(offset, take).sum()
+                rows += take
+                offset += take
+        if rows:
+            yield header + b''.join(parts), rows
+
+    def _bulk2_upload(self, job_id: str, payload: bytes) -> None:
+        """Upload a CSV payload to an open Bulk2 ingest job."""
+        url = f"{self.sf.bulk2_url}ingest/{job_id}/batches"
+        headers = {**self.headers, "Content-Type": "text/csv; charset=UTF-8"}
+        response = self._request(self.session.put, url, headers=headers, data=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+    def _send_composite(self, 
+                        http_method: str, 
+                        url: str, 
+                        sobject: str, 
+                        all_or_none: bool, 
+                        result_schema: dict[str, pl.DataType],
+                        batch: pl.DataFrame,
+                        attempt: int = 0) -> pl.DataFrame:
+        """Send one composite sObject batch and return its results joined to the input rows by position."""
+        with self._span('salesforce.batch', sobject=sobject, operation=http_method, rows=batch.height, 
+                        attempt=attempt) as span:
+            start = time.perf_counter()
+            composite_body = self._composite_body(batch, sobject, all_or_none)
+            encoded = time.perf_counter()
+            try:
+                response = self._request(self.session.request, http_method, url=url, headers=self.headers, 
+                                         data=composite_body, timeout=self.timeout)
+                response.raise_for_status()
+                received = time.perf_counter()
+                results = self._batch_results(batch, result_schema, response.content)
+            except requests.RequestException as e:
+                logger.warning(f"Composite {http_method} batch of {batch.height} {sobject} records failed: {e}")
+                received = time.perf_counter()
+                results = self._batch_results(batch, result_schema, error=e)
+            if span is not None:
+                span.update(bytes_sent=len(composite_body), encode_seconds=encoded - start, 
+                            parse_seconds=time.perf_counter() - received)
+            resend = partial(self._send_composite, http_method, url, sobject, all_or_none, result_schema)
+            results = self._retry_locked_rows(resend, results, batch, all_or_none, attempt)
+            if span is not None:
+                self._count_rows(span, results)
+            return results
+
+    def _send_delete(self, all_or_none: bool, batch: pl.DataFrame, attempt: int = 0) -> pl.DataFrame:
+        """Send one composite delete batch and return its results joined to the Ids by position."""
+        with self._span('salesforce.batch', operation='DELETE', rows=batch.height, attempt=attempt) as span:
+            url = self._build_delete_url(batch['Id'].to_list(), all_or_none)
+            try:
+                response = self._request(self.session.delete, url=url, headers=self.headers, timeout=self.timeout)
+                response.raise_for_status()
+                results = self._batch_results(batch, _COMPOSITE_RESULT_SCHEMA, response.content)
+            except requests.RequestException as e:
+                logger.warning(f"Composite DELETE batch of {batch.height} records failed: {e}")
+                results = self._batch_results(batch, _COMPOSITE_RESULT_SCHEMA, error=e)
+            results = self._retry_locked_rows(partial(self._send_delete, all_or_none), results, batch, all_or_none, 
+                                              attempt)
+            if span is not None:
+                self._count_rows(span, results)
+            return results
+
+    @staticmethod
+    def _count_rows(span: dict, results: pl.DataFrame) -> None:
+        """Add the succeeded and failed row counts of a batch to its span."""
+        ok = int(results['success'].sum())
+        span.update(rows_ok=ok, rows_failed=results.height - ok)
+
+    def _request(self, send, *args, **kwargs) -> requests.Response:
+        """Send a request paced by the org rate limiter, backing off and retrying while the org throttles.
+
+        A request rejected for an expired session is sent again once with a renewed session.
+        """
+        with self._span('salesforce.request', retries=0) as span:
+            for attempt in range(self.max_retries + 1):
+                self._limiter.acquire()
+                response = send(*args, **kwargs)
+                if self._session_key is not None and self._is_invalid_session(response):
+                    session_id, _ = self._renew_session(kwargs.get('headers', {}).get('Authorization'))
+                    kwargs['headers'] = {**kwargs['headers'], 'Authorization': f"Bearer {session_id}"}
+                    response = send(*args, **kwargs)
+                if not self._is_throttled(response):
+                    self._limiter.succeed()
+                    break
+                if attempt == self.max_retries:
+                    break
+                delay = self._limiter.throttle(attempt, response.headers.get('Retry-After'))
+                logger.warning(f"Salesforce throttled the request ({response.status_code}), retrying in {delay:.1f}s")
+                if span is not None:
+                    span['retries'] += 1
+                time.sleep(delay)
+            if span is not None:
+                self._describe_request(span, response, kwargs)
+            return response
+
+    def _describe_request(self, span: dict, response: requests.Response, kwargs: dict) -> None:
+        """Add the method, URL, sizes, status and API limit headroom of a request to its span."""
+        data = kwargs.get('data')
+        usage = self._limiter.api_usage
+        span.update(
+            method=getattr(response.request, 'method', None), 
+            url=(response.url or '').split('?', 1)[0], 
+            status=response.status_code, 
+            bytes_sent=len(data) if isinstance(data, (bytes, str)) else 0, 
+            bytes_received=len(response.content), 
+            api_remaining=usage[1] - usage[0] if usage else None,
+        )
+
+    def _retry_locked_rows(self, 
+                           resend, 
+                           results: pl.DataFrame, 
+                           batch: pl.DataFrame, 
+                           all_or_none: bool, 
+                           attempt: int) -> pl.DataFrame:
+        """Resend the rows of a batch that failed on UNABLE_TO_LOCK_ROW and splice their results back in."""
+        locked = self._locked_rows(results, all_or_none)
+        if not locked.any() or attempt >= self.max_retries:
+            return results
+        delay = self._limiter.throttle(attempt)
+        logger.warning(f"{locked.sum()} records hit UNABLE_TO_LOCK_ROW, retrying in {delay:.1f}s")
+        time.sleep(delay)
+        return self._splice_retried(results, locked, resend(batch.filter(locked), attempt=attempt + 1))
+
+    @staticmethod
+    def _locked_rows(results: pl.DataFrame, all_or_none: bool) -> pl.Series:
+        """Mask of the batch rows to resend because a row failed on UNABLE_TO_LOCK_ROW."""
+        locked = (results['errors'].list.eval(pl.element().struct.field('statusCode') == 'UNABLE_TO_LOCK_ROW')
+                  .list.any().fill_null(False))
+        if all_or_none and locked.any():
+            # The whole batch was rolled back, so every row has to be sent again
+            return pl.Series([True] * results.height)
+        return locked
+
+    @staticmethod
+    def _splice_retried(results: pl.DataFrame, locked: pl.Series, retried: pl.DataFrame) -> pl.DataFrame:
+        """Replace the results of the resent rows with their retried results, keeping the input order."""
+        return (
+            pl.concat([results.with_row_index('_row').filter(~locked), 
+                       retried.insert_column(0, locked.arg_true().alias('_row'))])
+            .sort('_row')
+            .drop('_row')
+        )
+
+    def _login(self, stale: str | None = None) -> tuple[str, str]:
+        """Return a (session_id, instance) for the credentials, logging in only when no usable session is cached.
+
+        Sessions are looked up in the process cache, then in the session cache directory. A cached
+        session equal to the stale one has expired, so the credentials log in again.
+        """
+        with _SESSIONS_LOCK:
+            session = _SESSIONS.get(self._session_key)
+            if session is None or session[0] == stale:
+                session = self._read_session_file()
+            if session is None or session[0] == stale:
+                logger.info(f"Logging in to Salesforce as {self._session_key[0]}")
+                sf = SF(**self._credentials, session=self.session)
+                session = (sf.session_id, sf.sf_instance)
+                self._write_session_file(session)
+            _SESSIONS[self._session_key] = session
+            return session
+
+    def _renew_session(self, authorization: str | None) -> tuple[str, str]:
+        """Replace an expired session everywhere this connector uses it.
+
+        Requests that failed together pass the Authorization header they were sent with, so only the
+        first of them logs in and the others pick up the renewed session. None always renews.
+        """
+        with self._login_lock:
+            if authorization is None or authorization == self.headers['Authorization']:
+                session_id, instance = self._login(stale=self.sf.session_id)
+                self.sf.session_id, self.sf.sf_instance = session_id, instance
+                self.sf._generate_headers()
+                # Updated in place, since async connectors share this dict
+                self.headers['Authorization'] = f"Bearer {session_id}"
+            return self.sf.session_id, self.sf.sf_instance
+
+    def _renew_sent_session(self) -> tuple[str, str]:
+        """Login hook of simple_salesforce, renewing the session its last request on this thread was sent
+        with, so a session another thread has already renewed is adopted instead of logging in again."""
+        return self._renew_session(getattr(self._sent, 'authorization', None))
+
+    def _with_session(self, call):
+        """Run a simple_salesforce call, renewing the session and retrying once if it has expired."""
+        authorization = self.headers['Authorization']
+        try:
+            return call()
+        except SalesforceExpiredSession:
+            if self._session_key is None:
+                raise
+            self._renew_session(authorization)
+            return call()
+
+    def _bulk2_client(self, sobject: str):
+        """Return a Bulk2 client of the sObject authorized with the current session."""
+        return getattr(self.sf.bulk2, sobject)._client
+
+    def _session_file(self) -> str:
+        username, domain = self._session_key
+        name = hashlib.sha256(f"{username}@{domain}".encode()).hexdigest()[:32]
+        return os.path.join(self.session_cache_dir, f"{name}.json")
+
+    def _read_session_file(self) -> tuple[str, str] | None:
+        if not self.session_cache_dir:
+            return None
+        path = self._session_file()
+        try:
+            if os.stat(path).st_mode & 0o077:
+                logger.warning(f"Ignoring session cache {path}: it is readable by other users")
+                return None
+            with open(path) as f:
+                cached = json.load(f)
+            return cached['session_id'], cached['instance']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_session_file(self, session: tuple[str, str]) -> None:
+        """Write the session to a file only the current user can read."""
+        if not self.session_cache_dir:
+            return
+        os.makedirs(self.session_cache_dir, mode=0o700, exist_ok=True)
+        path = self._session_file()
+        fd = os.open(f"{path}.tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({"session_id": session[0], "instance": session[1]}, f)
+        os.replace(f"{path}.tmp", path)
+
+    @staticmethod
+    def _is_invalid_session(response: requests.Response) -> bool:
+        if response.status_code != 401:
+            return False
+        try:
+            body = response.json()
+            error = body[0] if isinstance(body, list) else body
+            return error.get('errorCode') == 'INVALID_SESSION_ID'
+        except (ValueError, LookupError, AttributeError):
+            return False
+
+    def _track_limits(self, response: requests.Response, *args, **kwargs) -> requests.Response:
+        """Session response hook recording the API usage reported by the Sforce-Limit-Info header."""
+        self._limiter.record_usage(response.headers.get('Sforce-Limit-Info'))
+        return response
+
+    @staticmethod
+    def _is_throttled(response: requests.Response) -> bool:
+        """Whether a response is a rate limit, unavailability or row lock error worth retrying."""
+        if response.status_code in (429, 503):
+            return True
+        if response.status_code < 400:
+            return False
+        try:
+            body = response.json()
+            error = body[0] if isinstance(body, list) else body
+            code, message = error.get('errorCode'), error.get('message', '')
+        except (ValueError, LookupError, AttributeError):
+            return False
+        # The daily request limit won't reset within a backoff, unlike the concurrent request limits
+        return code in _THROTTLE_ERRORS and 'TotalRequests' not in message
+
+    @staticmethod
+    def _serialize_datetimes(batch: pl.DataFrame) -> pl.DataFrame:
+        """Format Datetime columns as ISO 8601 UTC strings; naive values are sent as UTC."""
+        datetimes = [
+            (pl.col(name).dt.convert_time_zone('UTC') if dtype.time_zone else pl.col(name))
+            .dt.to_string('%Y-%m-%dT%H:%M:%S%.3fZ')
+            for name, dtype in batch.schema.items() if isinstance(dtype, pl.Datetime)
+        ]
+        return batch.with_columns(datetimes) if datetimes else batch
+
+    @classmethod
+    def _encode_records(cls, batch: pl.DataFrame, sobject: str) -> bytes:
+        """Encode a batch as a JSON array of sObject records with the polars JSON writer."""
+        attributes = pl.Series('attributes', [{'type': sobject}]).new_from_index(0, batch.height)
+        return attributes.to_frame().hstack(cls._serialize_datetimes(batch)).write_json().encode()
+
+    @classmethod
+    def _composite_body(cls, batch: pl.DataFrame, sobject: str, all_or_none: bool) -> bytes:
+        """Encode the request body of one composite sObject batch."""
+        return (b'{"allOrNone":' + (b'true' if all_or_none else b'false') + 
+                b',"records":' + cls._encode_records(batch, sobject) + b'}')
+
+    @classmethod
+    def _batch_results(cls, 
+                       batch: pl.DataFrame, 
+                       result_schema: dict[str, pl.DataType], 
+                       content: bytes | None = None, 
+                       error: Exception | None = None) -> pl.DataFrame:
+        """Decode the per-record results of a composite response, or of a batch that failed as a whole
+        with error, and join them to the input rows by position."""
+        if error is not None:
+            batch_results = pl.DataFrame([cls._batch_error(error)] * batch.height, schema=result_schema)
+        else:
+            batch_results = pl.read_json(content, schema=result_schema)
+        # Result columns of an earlier run in the input, e.g. a re-sent result frame, are replaced by this run's
+        return pl.concat([batch_results, batch.drop(batch_results.columns, strict=False)], how='horizontal')
+
+    @staticmethod
+    def _batch_error(error: Exception) -> dict:
+        """Build a per-record result for a batch that failed as a whole."""
+        response = getattr(error, 'response', None)
+        status_code = str(response.status_code) if response is not None else 'REQUEST_FAILED'
+        message = str(error)
+        if response is not None:
+            try:
+                body = response.json()
+                status_code = body[0].get('errorCode', status_code)
+                message = body[0].get('message', message)
+            except (ValueError, LookupError, AttributeError):
+                pass
+        return {"id": None, "success": False, "errors": [{"statusCode": status_code, "message": message, "fields": []}]}
+
+
+class Bulk2Job:
+    """Handle to the Bulk2 ingest jobs of one submitted load.
+
+    Salesforce processes the jobs in the background; poll, wait or wait_all check their state and
+    result fetches them through the same result handling as the blocking create/update/delete.
+    """
+    def __init__(self, conn: Salesforce, sobject: str, jobs: dict[str, int]) -> None:
+        self.conn = conn
+        self.sobject = sobject
+        self.job_ids = list(jobs)
+        self._totals = jobs
+        self._info = {}
+
+    def __repr__(self) -> str:
+        return f"Bulk2Job(sobject={self.sobject!r}, job_ids={self.job_ids!r}, done={self.done()})"
+
+    def done(self) -> bool:
+        return len(self._info) == len(self.job_ids)
+
+    def poll(self) -> bool:
+        """Refresh the state of unfinished jobs and return whether all of them are complete."""
+        for job_id in self.job_ids:
+            if job_id in self._info:
+                continue
+            job = self.conn._with_session(lambda: self.conn._bulk2_client(self.sobject).get_job(job_id, False))
+            if job['state'] in ('Failed', 'Aborted'):
+                raise RuntimeError(f"Bulk2 job {job_id} {job['state'].lower()}: {job.get('errorMessage')}")
+            if job['state'] == 'JobComplete':
+                self._info[job_id] = job
+                # Salesforce reports how long it spent processing the job
+                with self.conn._span('salesforce.bulk2.job', sobject=self.sobject, operation=job.get('operation'), 
+                                     job_id=job_id) as span:
+                    if span is not None:
+                        span.update(rows_ok=int(job['numberRecordsProcessed']) - int(job['numberRecordsFailed']), 
+                                    rows_failed=int(job['numberRecordsFailed']), 
+                                    processing_seconds=job.get('totalProcessingTime', 0) / 1000)
+        if self.done():
+            # The load has been applied, so cached query results of the sObject are stale
+            self.conn.invalidate_cache(self.sobject)
+        return self.done()
+
+    def wait(self, timeout: float | None = None) -> 'Bulk2Job':
+        wait_all([self], timeout)
+        return self
+
+    @property
+    def results(self) -> list[dict]:
+        """Per-job record counts in the shape the ingest result handler expects."""
+        if not self.done():
+            raise RuntimeError(f"Bulk2 jobs of {self.sobject} are still running")
+        return [
+            {
+                "numberRecordsFailed": int(self._info[job_id]["numberRecordsFailed"]),
+                "numberRecordsProcessed": int(self._info[job_id]["numberRecordsProcessed"]),
+                "numberRecordsTotal": self._totals[job_id],
+                "job_id": job_id,
+            }
+            for job_id in self.job_ids
+        ]
+
+    def result(self, 
+               to_dataframe: bool = True, 
+               output_dir: str | None = 'results', 
+               timeout: float | None = None) -> pl.DataFrame:
+        """Wait for the jobs and return their successful, failed and unprocessed records."""
+        self.wait(timeout)
+        df = self.conn._result_handler(self.results, to_dataframe, output_dir, self.sobject, ingest=True)
+        if to_dataframe:
+            return df
+
+
+def wait_all(jobs: list[Bulk2Job], timeout: float | None = None) -> list[Bulk2Job]:
+    """Poll submitted Bulk2 jobs together until all of them complete.
+
+    The polling interval starts at half a second and doubles up to 15 seconds while nothing finishes,
+    so short jobs are picked up quickly and long ones don't burn API requests.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    interval = _BULK2_POLL_MIN
+    pending = [job for job in jobs if not job.done()]
+    while pending:
+        still_running = [job for job in pending if not job.poll()]
+        if not still_running:
+            break
+        if deadline is not None and time.monotonic() + interval > deadline:
+            raise TimeoutError(f"{len(still_running)} Bulk2 loads still running after {timeout}s")
+        time.sleep(interval)
+        # Start over from the shortest interval whenever a load finishes
+        interval = _BULK2_POLL_MIN if len(still_running) < len(pending) else min(_BULK2_POLL_MAX, interval * 2)
+        pending = still_running
+    return jobs
+
+
+class _ResultCache:
+    """On-disk cache of query results as uncompressed IPC files.
+
+    Files are named {sobject}-{key}-{created}.arrow, so entries expire by their creation time and can
+    be invalidated per sObject without an index. Hits bump the file mtime, which drives LRU eviction
+    once the cache grows past max_bytes. Hits are memory-mapped rather than copied.
+    """
+    def __init__(self, path: str, ttl: float, max_bytes: int) -> None:
+        self._path = path
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(soql: str, method: str) -> str:
+        normalized = ' '.join(soql.split())
+        return hashlib.sha256(f"{method}:{normalized}".encode()).hexdigest()[:32]
+
+    def get(self, sobject: str, key: str) -> pl.DataFrame | None:
+        with self._lock:
+            for name in self._entries(f"{sobject.lower()}-{key}-"):
+                path = os.path.join(self._path, name)
+                if time.time() - int(name.rsplit('-', 1)[1].split('.')[0]) > self._ttl:
+                    os.remove(path)
+                    continue
+                os.utime(path)
+                # Uncompressed local IPC files are memory-mapped by polars
+                return pl.read_ipc(path)
+        return None
+
+    def put(self, sobject: str, key: str, df: pl.DataFrame) -> None:
+        path = os.path.join(self._path, f"{sobject.lower()}-{key}-{int(time.time())}.arrow")
+        df.write_ipc(f"{path}.tmp", compression='uncompressed')
+        with self._lock:
+            for name in self._entries(f"{sobject.lower()}-{key}-"):
+                os.remove(os.path.join(self._path, name))
+            os.replace(f"{path}.tmp", path)
+            self._evict()
+
+    def invalidate(self, sobject: str | None = None) -> None:
+        with self._lock:
+            for name in self._entries(f"{sobject.lower()}-" if sobject else ''):
+                os.remove(os.path.join(self._path, name))
+
+    def _entries(self, prefix: str) -> list[str]:
+        return [name for name in os.listdir(self._path) if name.startswith(prefix) and name.endswith('.arrow')]
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache fits within max_bytes."""
+        entries = []
+        for name in self._entries(''):
+            stat = os.stat(os.path.join(self._path, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self._max_bytes:
+                break
+            os.remove(os.path.join(self._path, name))
+            total -= size
+
+
+class _OrgRateLimiter(_RateLimiter):
+    """Rate limiter of one org that also tracks the org's daily API usage from Sforce-Limit-Info."""
+    def __init__(self, max_rate: float) -> None:
+        super().__init__(max_rate)
+        self.api_usage = None
+
+    def record_usage(self, header: str | None) -> None:
+        match = re.search(r'api-usage=(\d+)/(\d+)', header or '')
+        if match:
+            self.api_usage = (int(match.group(1)), int(match.group(2)))
+
+
+# Sessions of username logins shared by every connector in the process, keyed by (username, domain)
+_SESSIONS: dict[tuple[str, str], tuple[str, str]] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+def _session_key(credentials: dict) -> tuple[str, str] | None:
+    """Return the session cache key of credentials that log in, or None for a given session_id."""
+    if 'username' not in credentials or 'session_id' in credentials:
+        return None
+    return credentials['username'], credentials.get('domain') or 'login'
+
+
+_RATE_LIMITERS: dict[str, _OrgRateLimiter] = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+
+def _rate_limiter(instance: str, max_rate: float) -> _OrgRateLimiter:
+    """Return the rate limiter shared by every connector to an org instance, capped at the lowest
+    max_rate any of them asked for."""
+    with _RATE_LIMITERS_LOCK:
+        limiter = _RATE_LIMITERS.get(instance)
+        if limiter is None:
+            limiter = _RATE_LIMITERS[instance] = _OrgRateLimiter(max_rate)
+        elif max_rate < limiter.max_rate:
+            logger.info(f"Lowering the request rate cap of {instance} to {max_rate}/s for every connector to it")
+            limiter.lower_max_rate(max_rate)
+        elif max_rate > limiter.max_rate:
+            logger.warning(f"Requests to {instance} stay capped at {limiter.max_rate}/s, "
+                           f"the lowest rate another connector to it asked for")
+        return limiter
+
+
+class _PacedSession:
+    """Session handed to simple_salesforce that sends its requests through the connector's _request,
+    so they are paced by the org rate limiter and retried while the org throttles."""
+    def __init__(self, conn: Salesforce) -> None:
+        self._conn = conn
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        self._conn._sent.authorization = (kwargs.get('headers') or {}).get('Authorization')
+        return self._conn._request(self._conn.session.request, method, url, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self._conn.session, name)
+
+
+class _BatchJournal:
+    """SQLite journal of the finished batches of a REST load, keyed by their input offset.
+
+    Each batch that wrote at least one record is stored with its row count and its result frame
+    as Arrow IPC. Batches where every record failed wrote nothing, so they are left out and sent
+    again on resume. The journal also stores a fingerprint of the input rows and refuses to resume
+    a load over different data (the fingerprint uses hash_rows, so resume with the same polars).
+    """
+    def __init__(self, path: str, data: pl.DataFrame) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS batches (offset INTEGER PRIMARY KEY, rows INTEGER NOT NULL, results BLOB NOT NULL)"
+        )
+        fingerprint = self.fingerprint(data)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None:
+            self._db.execute("INSERT INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+        elif row[0] != fingerprint:
+            self._db.close()
+            raise ValueError(f"Journal {path} belongs to a load of different input data")
+
+    @staticmethod
+    def fingerprint(data: pl.DataFrame) -> str:
+        hashes = data.hash_rows().to_frame().write_ipc(None).getvalue()
+        return f"{data.height}:{hashlib.sha256(hashes).hexdigest()}"
+
+    @staticmethod
+    def gaps(finished: dict[int, int], height: int) -> list[tuple[int, int]]:
+        """Return the (start, end) input ranges not covered by the finished batches."""
+        gaps, position = [], 0
+        for offset, rows in sorted(finished.items()):
+            if offset > position:
+                gaps.append((position, offset))
+            position = max(position, offset + rows)
+        if position < height:
+            gaps.append((position, height))
+        return gaps
+
+    def batches(self) -> dict[int, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT offset, rows FROM batches").fetchall())
+
+    def record(self, offset: int, results: pl.DataFrame) -> None:
+        if not results['success'].any():
+            return
+        buffer = io.BytesIO()
+        results.write_ipc(buffer)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO batches VALUES (?, ?, ?)", (offset, results.height, buffer.getvalue()))
+
+    def load(self, offsets) -> dict[int, pl.DataFrame]:
+        """Read the stored results of the given batch offsets."""
+        with self._lock:
+            return {
+                offset: pl.read_ipc(io.BytesIO(blob))
+                for offset, blob in self._db.execute("SELECT offset, results FROM batches") if offset in offsets
+            }
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class _BatchSizer:
+    """Sizes composite REST batches from per-row payload bytes and observed batch latency.
+
+    Batch sizes grow additively while batches come back well under the target latency and halve
+    when they exceed it; every batch also stays under the composite byte budget.
+    """
+    def __init__(self, 
+                 row_bytes: pl.Series, 
+                 max_records: int = _COMPOSITE_MAX_RECORDS, 
+                 max_bytes: int = _COMPOSITE_TARGET_BYTES, 
+                 target_latency: float = 10.0) -> None:
+        self._row_bytes = row_bytes
+        self._max_records = max_records
+        self._max_bytes = max_bytes
+        self._target_latency = target_latency
+        self._size = max_records
+        self._lock = threading.Lock()
+
+    def next_size(self, offset: int) -> int:
+        with self._lock:
+            size = min(self._size, len(self._row_bytes) - offset)
+        return _bytes_bounded_size(self._row_bytes, offset, size, self._max_bytes)
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            if latency > self._target_latency:
+                self._size = max(1, self._size // 2)
+            elif latency < self._target_latency / 2:
+                self._size = min(self._max_records, self._size + max(1, self._size // 4))
+
+
+def _bytes_bounded_size(row_bytes: pl.Series, offset: int, max_rows: int, max_bytes: int) -> int:
+    """Return how many rows from offset (at most max_rows, at least one) fit within max_bytes."""
+    window = row_bytes.slice(offset, max_rows).cum_sum()
+    return max(1, window.search_sorted(max_bytes, side='right'))
+
+
+def scan_salesforce(conn: Salesforce, 
+                    sobject: str, 
+                    method: str = 'auto', 
+                    bulk2_threshold: int = _BULK2_ROW_THRESHOLD) -> pl.LazyFrame:
+    """Lazily scan an sObject, pushing selected columns and simple filters down into the SOQL query.
+
+    Column selections become the SOQL field list, and comparisons, is_in, is_between and null checks
+    become the WHERE clause. Predicates that can't be translated are still applied locally. With
+    method='auto' the query runs through REST or Bulk2 depending on a COUNT() estimate.
+    """
+    if method not in ('auto', 'rest', 'bulk2'):
+        raise ValueError(f"Invalid query method: {method}. Use 'auto', 'rest' or 'bulk2'")
+    schema = conn._describe_schema(sobject)
+
+    def source(with_columns: list[str] | None, 
+               predicate: pl.Expr | None, 
+               n_rows: int | None, 
+               batch_size: int | None) -> Iterator[pl.DataFrame]:
+        columns = with_columns or list(schema)
+        fields = list(dict.fromkeys(columns + (predicate.meta.root_names() if predicate is not None else [])))
+        where, complete = _predicate_to_soql(predicate, schema) if predicate is not None else ('', True)
+        where = f" WHERE {where}" if where else ''
+        soql = f"SELECT {', '.join(fields or ['Id'])} FROM {sobject}{where}"
+        if n_rows is not None and complete:
+            soql += f" LIMIT {n_rows}"
+
+        query_method = method
+        if query_method == 'auto':
+            estimate = conn._estimate_count(sobject, where)
+            if n_rows is not None and complete:
+                estimate = min(estimate, n_rows)
+            query_method = 'bulk2' if estimate > bulk2_threshold else 'rest'
+        logger.info(f"Scanning {sobject} through {query_method}: {soql}")
+        if query_method == 'rest':
+            pages = conn._query_pages(soql, batch_size)
+        else:
+            pages = (conn._apply_schema(pl.read_csv(page, infer_schema=False), schema)
+                     for page in conn._bulk2_query_pages(soql, batch_size or 50000) if page.strip())
+
+        for df in pages:
+            if predicate is not None:
+                df = df.filter(predicate)
+            df = df.select(columns)
+            if n_rows is not None:
+                df = df.head(n_rows)
+                n_rows -= df.height
+            yield df
+            if n_rows == 0:
+                break
+
+    options = {'explain_name': f"salesforce:{sobject}"} if _NAMED_IO_SOURCES else {}
+    return register_io_source(source, schema=schema, **options)
+
+
+class _Untranslatable(Exception):
+    """Raised for predicate nodes that have no SOQL equivalent."""
+
+
+def _predicate_to_soql(predicate: pl.Expr, schema: dict[str, pl.DataType]) -> tuple[str, bool]:
+    """Translate a Polars predicate to a SOQL WHERE clause.
+
+    Returns the clause and whether it covers the whole predicate. Untranslatable parts of an AND are
+    dropped, so the clause always selects a superset of the rows the predicate keeps. Nothing is
+    pushed down when this polars release serializes predicates in a layout the translator doesn't read.
+    """
+    if not _plan_format_supported():
+        return '', False
+    return _translate_predicate(predicate, schema)
+
+
+def _translate_predicate(predicate: pl.Expr, schema: dict[str, pl.DataType]) -> tuple[str, bool]:
+    """Translate the serialized plan of a predicate."""
+    try:
+        node = json.loads(predicate.meta.serialize(format='json'))
+    except Exception:
+        return '', False
+    return _translate_conjunction(node, schema)
+
+
+@cache
+def _plan_format_supported() -> bool:
+    """Check that a known predicate translates exactly, as the serialized plan format is unstable across releases."""
+    schema = {'Amount': pl.Float64, 'Name': pl.String, 'CloseDate': pl.Date, 'IsWon': pl.Boolean}
+    probe = ((pl.col('Amount') >= 100) & pl.col('Name').is_in(['Acme']) & pl.col('Name').str.starts_with('A')
+             & pl.col('CloseDate').is_between(date(2024, 1, 1), date(2024, 1, 31)) & pl.col('IsWon')
+             & pl.col('Amount').is_not_null())
+    expected = ("Amount >= 100 AND Name IN ('Acme') AND Name LIKE 'A%' AND "
+                "(CloseDate >= 2024-01-01 AND CloseDate <= 2024-01-31) AND IsWon = true AND Amount != null")
+    if _translate_predicate(probe, schema) != (expected, True):
+        logger.warning(f"Polars {pl.__version__} serializes predicates in an unsupported layout, "
+                       "so scan_salesforce filters are applied locally instead of in SOQL")
+        return False
+    return True
+
+
+def _translate_conjunction(node: dict, schema: dict[str, pl.DataType]) -> tuple[str, bool]:
+    """Translate an AND tree, keeping the conjuncts that translate."""
+    if 'BinaryExpr' in node and node['BinaryExpr']['op'] in ('And', 'LogicalAnd'):
+        left, left_complete = _translate_conjunction(node['BinaryExpr']['left'], schema)
+        right, right_complete = _translate_conjunction(node['BinaryExpr']['right'], schema)
+        clause = ' AND '.join(part for part in (left, right) if part)
+        return clause, left_complete and right_complete
+    try:
+        return _translate_node(node, schema), True
+    except Exception:
+        return '', False
+
+
+def _translate_node(node: dict, schema: dict[str, pl.DataType]) -> str:
+    """Translate a single predicate node, raising _Untranslatable when there is no SOQL equivalent."""
+    if 'Column' in node and schema.get(node['Column']) == pl.Boolean:
+        return f"{node['Column']} = true"
+    if 'BinaryExpr' in node:
+        left, op, right = node['BinaryExpr']['left'], node['BinaryExpr']['op'], node['BinaryExpr']['right']
+        if op in ('And', 'LogicalAnd', 'Or', 'LogicalOr'):
+            joiner = ' AND ' if op in ('And', 'LogicalAnd') else ' OR '
+            return f"({_translate_node(left, schema)}{joiner}{_translate_node(right, schema)})"
+        if op not in _COMPARISON_OPS:
+            raise _Untranslatable(op)
+        if 'Column' in right and 'Literal' in left:
+            left, right, op = right, left, _FLIPPED_OPS[op]
+        return f"{_column(left, schema)} {_COMPARISON_OPS[op]} {_soql_literal(_literal_value(right))}"
+    if 'Function' in node:
+        inputs, function = node['Function']['input'], node['Function']['function']
+        if function == {'Boolean': 'IsNull'}:
+            return f"{_column(inputs[0], schema)} = null"
+        if function == {'Boolean': 'IsNotNull'}:
+            return f"{_column(inputs[0], schema)} != null"
+        if isinstance(function.get('Boolean'), dict) and 'IsIn' in function['Boolean']:
+            values = ', '.join(_soql_literal(value) for value in _literal_value(inputs[1]))
+            return f"{_column(inputs[0], schema)} IN ({values})"
+        if function == {'Boolean': 'Not'} and 'Function' in inputs[0]:
+            inner = inputs[0]['Function']
+            if isinstance(inner['function'].get('Boolean'), dict) and 'IsIn' in inner['function']['Boolean']:
+                values = ', '.join(_soql_literal(value) for value in _literal_value(inner['input'][1]))
+                return f"{_column(inner['input'][0], schema)} NOT IN ({values})"
+        if isinstance(function.get('Boolean'), dict) and 'IsBetween' in function['Boolean']:
+            closed = function['Boolean']['IsBetween']['closed']
+            column = _column(inputs[0], schema)
+            lower = '>=' if closed in ('Both', 'Left') else '>'
+            upper = '<=' if closed in ('Both', 'Right') else '<'
+            return (f"({column} {lower} {_soql_literal(_literal_value(inputs[1]))} AND "
+                    f"{column} {upper} {_soql_literal(_literal_value(inputs[2]))})")
+        if function in ({'StringExpr': 'StartsWith'}, {'StringExpr': 'EndsWith'}):
+            value = _literal_value(inputs[1])
+            if not isinstance(value, str) or '%' in value or '_' in value:
+                raise _Untranslatable(function)
+            pattern = f"{value}%" if function['StringExpr'] == 'StartsWith' else f"%{value}"
+            return f"{_column(inputs[0], schema)} LIKE {_soql_literal(pattern)}"
+    raise _Untranslatable(node)
+
+
+def _column(node: dict, schema: dict[str, pl.DataType]) -> str:
+    """Return the field name of a column node that exists on the sObject."""
+    if 'Column' not in node or node['Column'] not in schema:
+        raise _Untranslatable(node)
+    return node['Column']
+
+
+def _literal_value(node: dict):
+    """Decode a serialized Polars literal to a Python value."""
+    if 'Literal' not in node:
+        raise _Untranslatable(node)
+    literal = node['Literal']
+    if 'Dyn' in literal:
+        return next(iter(literal['Dyn'].values()))
+    scalar = literal.get('Scalar', {})
+    if not isinstance(scalar, dict) or len(scalar) != 1:
+        raise _Untranslatable(node)
+    kind, value = next(iter(scalar.items()))
+    if kind == 'List':
+        return pl.read_ipc_stream(io.BytesIO(bytes(value))).to_series().to_list()
+    if kind == 'Date':
+        return date.fromordinal(date(1970, 1, 1).toordinal() + value)
+    if kind == 'Datetime':
+        ticks, unit, _ = value
+        divisor = {'Milliseconds': 1_000, 'Microseconds': 1_000_000, 'Nanoseconds': 1_000_000_000}[unit]
+        return datetime.fromtimestamp(ticks / divisor, tz=timezone.utc)
+    if kind in ('String', 'Boolean') or kind.startswith(('Int', 'UInt', 'Float')):
+        return value
+    raise _Untranslatable(node)
+
+
+def _top_level_from(soql: str) -> re.Match | None:
+    """Match the FROM clause of the outer query, skipping parenthesised subqueries and string literals.
+
+    The match is made on a masked copy of the same length, so its positions index into soql and
+    group(1) is the sObject name.
+    """
+    masked, depth, quoted, escaped = [], 0, False, False
+    for char in soql:
+        if quoted:
+            quoted = escaped or char != "'"
+            escaped = not escaped and char == '\\'
+            masked.append(' ')
+            continue
+        if char == "'":
+            quoted = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(0, depth - 1)
+        masked.append(char if depth == 0 and char not in "'()" else ' ')
+    return re.search(r'\bFROM\s+(\w+)', ''.join(masked), re.IGNORECASE)
+
+
+def _trailing_clause(soql: str) -> re.Match | None:
+    """Match the first ORDER BY, GROUP BY, LIMIT or OFFSET clause after the FROM clause of the outer query."""
+    match = _top_level_from(soql)
+    if not match:
+        return None
+    # Searched in the masked copy, so string literals and subqueries can't match
+    return re.compile(r'\b(ORDER\s+BY|GROUP\s+BY|LIMIT|OFFSET)\b', re.IGNORECASE).search(match.string, match.end())
+
+
+def _check_chunkable(soql: str) -> None:
+    """Raise a ValueError for a query chunked extraction can't split, before any of its requests are sent."""
+    if _top_level_from(soql) is None:
+        raise ValueError(f"Cannot find the FROM clause of query: {soql}")
+    # The range condition is ANDed onto the end of the query, so nothing may follow the WHERE clause
+    if _trailing_clause(soql):
+        raise ValueError("Chunked extraction does not support ORDER BY, GROUP BY, LIMIT or OFFSET")
+
+
+def _soql_where(soql: str) -> str:
+    """Return the WHERE clause of a query (with a leading space) without the clauses after it, or an empty string."""
+    match = _top_level_from(soql)
+    if not match:
+        return ''
+    clause = _trailing_clause(soql)
+    where = re.match(r'\s+WHERE\s+(.*)$', soql[match.end():clause.start() if clause else len(soql)],
+                     re.IGNORECASE | re.DOTALL)
+    return f" WHERE {where.group(1).strip()}" if where else ''
+
+
+def _chunk_query(soql: str, condition: str | None) -> str:
+    """Add a chunk range condition to the WHERE clause of a query."""
+    _check_chunkable(soql)
+    match = _top_level_from(soql)
+    head, tail = soql[:match.end()], soql[match.end():].strip()
+    if condition is None:
+        return soql
+    where = re.match(r'WHERE\s+(.*)$', tail, re.IGNORECASE | re.DOTALL)
+    if where:
+        return f"{head} WHERE ({condition}) AND ({where.group(1)})"
+    return f"{head} WHERE {condition}"
+
+
+def _chunk_conditions(field: str, boundaries: list[str]) -> list[str | None]:
+    """Build half-open range conditions covering everything below, between and above the boundaries."""
+    edges = [None, *boundaries, None]
+    conditions = []
+    for low, high in zip(edges, edges[1:]):
+        terms = ([f"{field} >= {low}"] if low else []) + ([f"{field} < {high}"] if high else [])
+        conditions.append(' AND '.join(terms) or None)
+    return conditions
+
 
+def _id_to_int(record_id: str) -> int:
+    """Decode the case-sensitive 15-character form of a Salesforce Id as a base-62 number."""
+    value = 0
+    for char in record_id[:15]:
+        value = value * 62 + _ID_ALPHABET.index(char)
+    return value
 
 
+def _int_to_id(value: int) -> str:
+    """Encode a base-62 number as a 15-character Salesforce Id."""
+    chars = []
+    for _ in range(15):
+        value, digit = divmod(value, 62)
+        chars.append(_ID_ALPHABET[digit])
+    return ''.join(reversed(chars))
 
 
+def _soql_literal(value) -> str:
+    """Format a Python value as a SOQL literal."""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc) if value.tzinfo else value
+        return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str):
+        escaped = value.replace('\\', '\\\\').replace("'", "\\'")
+        return f"'{escaped}'"
+    raise _Untranslatable(value)
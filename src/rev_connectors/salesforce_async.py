@@ -0,0 +1,504 @@
+import polars as pl
+import logging
+import asyncio
+import time
+from functools import partial
+from simple_salesforce.bulk2 import ColumnDelimiter, LineEnding, Operation
+from .salesforce import (
+    Salesforce,
+    _BatchJournal,
+    _BatchSizer,
+    _BULK2_POLL_MAX,
+    _BULK2_POLL_MIN,
+    _COMPOSITE_RESULT_SCHEMA,
+    _INGEST_STATUSES,
+    _UPSERT_RESULT_SCHEMA,
+)
+
+try:
+    import httpx
+except ImportError as e:
+    raise ImportError("AsyncSalesforce requires httpx, install it with: pip install 'rev-connectors[async]'") from e
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSalesforce:
+    """asyncio counterpart of the Salesforce connector.
+
+    read, create, update and delete take the same arguments and return the same frames as the
+    blocking connector, but every HTTP call (composite batches, query pages, Bulk2 uploads and job
+    polling) is awaited on one pooled httpx client, so a single event loop can keep many batches and
+    Bulk2 jobs in flight. Login, describe metadata, the result cache and the org rate limiter are
+    shared with a blocking Salesforce connector built from the same credentials.
+    """
+    def __init__(self,
+                 credentials: dict,
+                 max_connections: int = 100,
+                 max_retries: int = 3,
+                 timeout: float | tuple[float, float] = (10, 300),
+                 client: httpx.AsyncClient | None = None,
+                 **kwargs) -> None:
+        self.conn = Salesforce(credentials, max_retries=max_retries, timeout=timeout, **kwargs)
+        self.sf = self.conn.sf
+        self.version = self.conn.version
+        self.headers = self.conn.headers
+        self.max_retries = max_retries
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        self.client = client or httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(read, connect=connect),
+        )
+
+    async def __aenter__(self) -> 'AsyncSalesforce':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP client."""
+        await self.client.aclose()
+
+    def instrument(self, hook=None, tracer=None) -> None:
+        """Report spans of batches, pages, jobs and requests; see BaseConnector.instrument."""
+        self.conn.instrument(hook, tracer)
+
+    async def create(self,
+                     sobject: str,
+                     data: pl.DataFrame | pl.LazyFrame = None,
+                     input_file: str = None,
+                     method: str = 'rest',
+                     to_dataframe: bool = True,
+                     output_dir: str | None = 'results',
+                     upsert_key: str = None,
+                     batch_size: int | None = 200,
+                     all_or_none: bool = False,
+                     max_workers: int = 1,
+                     job_key: str | None = None) -> pl.DataFrame:
+        """Execute a Batched REST or Bulk - Insert or Upsert operation; max_workers batches are in flight at once."""
+        try:
+            data = self.conn._ingest_source(data, input_file)
+            if method == 'auto':
+                method = await asyncio.to_thread(self.conn._choose_method, data, batch_size)
+            if method == 'rest':
+                base = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects"
+                if upsert_key:
+                    send = partial(self._send_composite, 'PATCH', f"{base}/{sobject}/{upsert_key}", sobject,
+                                   all_or_none, _UPSERT_RESULT_SCHEMA)
+                else:
+                    send = partial(self._send_composite, 'POST', base, sobject, all_or_none, _COMPOSITE_RESULT_SCHEMA)
+                return await self._run_batches(send, data, batch_size, max_workers, job_key, output_dir)
+            elif method == 'bulk2':
+                operation = Operation.upsert if upsert_key else Operation.insert
+                return await self._bulk2_load(sobject, operation, data, to_dataframe, output_dir,
+                                              max_workers, upsert_key)
+            else:
+                raise ValueError(f"Invalid load method: {method}. Use 'auto', 'rest' or 'bulk2'")
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce create")
+            raise RuntimeError(f"Failed to execute Salesforce create: {str(e)}")
+        finally:
+            self.conn.invalidate_cache(sobject)
+
+    async def read(self,
+                   soql: str,
+                   method: str = 'rest',
+                   to_dataframe: bool = True,
+                   output_dir: str | None = 'results',
+                   page_size: int = 50000) -> pl.DataFrame:
+        """Execute a SOQL query using REST or Bulk2 API and return a Polars DataFrame."""
+        try:
+            sobject = self.conn._get_sobject_from_query(soql)
+            cache = self.conn._result_cache
+            cache_key = cache.key(soql, method) if cache and to_dataframe else None
+            if cache_key:
+                df = await asyncio.to_thread(cache.get, sobject, cache_key)
+                if df is not None:
+                    logger.info(f"Serving cached results for query: {soql}")
+                    return df
+
+            if method == 'rest':
+                frames = await self._query_pages(soql)
+                df = pl.concat(frames, how='diagonal_relaxed') if frames else pl.DataFrame()
+            elif method == 'bulk2':
+                pages = await self._bulk2_query_pages(soql, page_size)
+                # Parsing and writing pages is CPU and disk bound, so it runs off the event loop
+                df = await asyncio.to_thread(self.conn._result_handler, pages, to_dataframe, output_dir, sobject, False)
+                if not to_dataframe:
+                    return
+            else:
+                raise ValueError(f"Invalid query method: {method}. Use 'rest' or 'bulk2'")
+
+            if cache_key:
+                await asyncio.to_thread(cache.put, sobject, cache_key, df)
+            return df
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce query")
+            raise RuntimeError(f"Failed to execute Salesforce query: {str(e)}")
+
+    async def update(self,
+                     sobject: str,
+                     data: pl.DataFrame | pl.LazyFrame = None,
+                     input_file: str = None,
+                     method: str = 'rest',
+                     to_dataframe: bool = True,
+                     output_dir: str | None = 'results',
+                     batch_size: int | None = 200,
+                     all_or_none: bool = False,
+                     max_workers: int = 1,
+                     job_key: str | None = None) -> pl.DataFrame:
+        """Execute a Batched REST or Bulk - Update operation."""
+        try:
+            data = self.conn._ingest_source(data, input_file)
+            if method == 'auto':
+                method = await asyncio.to_thread(self.conn._choose_method, data, batch_size)
+            if method == 'rest':
+                url = f"https://{self.sf.sf_instance}/services/data/v{self.version}/composite/sobjects/"
+                send = partial(self._send_composite, 'PATCH', url, sobject, all_or_none, _COMPOSITE_RESULT_SCHEMA)
+                return await self._run_batches(send, data, batch_size, max_workers, job_key, output_dir)
+            elif method == 'bulk2':
+                return await self._bulk2_load(sobject, Operation.update, data, to_dataframe, output_dir,
+                                              max_workers)
+            else:
+                raise ValueError(f"Invalid load method: {method}. Use 'auto', 'rest' or 'bulk2'")
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce update")
+            raise RuntimeError(f"Failed to execute Salesforce update: {str(e)}")
+        finally:
+            self.conn.invalidate_cache(sobject)
+
+    async def delete(self,
+                     sobject: str,
+                     data: pl.DataFrame | pl.LazyFrame = None,
+                     input_file: str = None,
+                     method: str = 'rest',
+                     to_dataframe: bool = True,
+                     output_dir: str | None = 'results',
+                     batch_size: int | None = 200,
+                     all_or_none: bool = False,
+                     max_workers: int = 1,
+                     job_key: str | None = None) -> pl.DataFrame:
+        """Execute a Batched REST or Bulk - Delete operation."""
+        try:
+            data = self.conn._ingest_source(data, input_file).select('Id')
+            if method == 'auto':
+                method = await asyncio.to_thread(self.conn._choose_method, data, batch_size)
+            if method == 'rest':
+                send = partial(self._send_delete, all_or_none)
+                return await self._run_batches(send, data, batch_size, max_workers, job_key, output_dir)
+            elif method == 'bulk2':
+                return await self._bulk2_load(sobject, Operation.delete, data, to_dataframe, output_dir,
+                                              max_workers)
+            else:
+                raise ValueError(f"Invalid load method: {method}. Use 'auto', 'rest' or 'bulk2'")
+        except Exception as e:
+            logger.exception("Failed to execute Salesforce delete")
+            raise RuntimeError(f"Failed to execute Salesforce delete: {str(e)}")
+        finally:
+            self.conn.invalidate_cache(sobject)
+
+    async def _query_pages(self, soql: str) -> list[pl.DataFrame]:
+        """Follow nextRecordsUrl and return each page of records as a typed DataFrame."""
+        schema = await asyncio.to_thread(self.conn._query_schema, self.conn._get_sobject_from_query(soql))
+        base = f"https://{self.sf.sf_instance}"
+        response = await self._request('GET', f"{base}/services/data/v{self.version}/query",
+                                       params={"q": soql}, headers=self.headers)
+        frames = []
+        while True:
+            response.raise_for_status()
+            result = response.json()
+            if result['records']:
+                frames.append(self.conn._records_to_frame(result['records'], schema))
+            if result['done']:
+                return frames
+            response = await self._request('GET', f"{base}{result['nextRecordsUrl']}", headers=self.headers)
+
+    async def _run_batches(self,
+                           send,
+                           data: pl.DataFrame | pl.LazyFrame,
+                           batch_size: int | None,
+                           max_workers: int,
+                           job_key: str | None = None,
+                           output_dir: str | None = None) -> pl.DataFrame:
+        """Send batches with at most max_workers in flight, sized and journaled like Salesforce._run_batches."""
+        if isinstance(data, pl.LazyFrame):
+            data = await asyncio.to_thread(data.collect)
+        with Salesforce._journal(job_key, output_dir, data) as journal:
+            finished = journal.batches() if journal else {}
+            gaps = _BatchJournal.gaps(finished, data.height)
+
+            async def run(offset: int, batch: pl.DataFrame) -> pl.DataFrame:
+                df = await send(batch)
+                if journal:
+                    journal.record(offset, df)
+                return df
+
+            if batch_size is not None:
+                semaphore = asyncio.Semaphore(max_workers)
+
+                async def bounded(offset: int, size: int) -> pl.DataFrame:
+                    async with semaphore:
+                        return await run(offset, data.slice(offset, size))
+
+                bounds = Salesforce._batch_bounds(gaps, batch_size)
+                dfs = await asyncio.gather(*(bounded(offset, size) for offset, size in bounds))
+                results = {offset: df for (offset, _), df in zip(bounds, dfs)}
+            else:
+                sizer = _BatchSizer(Salesforce._row_bytes(data))
+                results = {}
+                pending = {}
+                while gaps or pending:
+                    while gaps and len(pending) < max_workers:
+                        start, size = Salesforce._next_batch(gaps, sizer)
+                        pending[asyncio.ensure_future(self._timed(partial(run, start), data.slice(start, size)))] = start
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        elapsed, df = task.result()
+                        sizer.observe(elapsed)
+                        results[pending.pop(task)] = df
+            if finished:
+                results = {**journal.load(finished), **results}
+        return Salesforce._ordered_results(results)
+
+    @staticmethod
+    async def _timed(send, batch: pl.DataFrame) -> tuple[float, pl.DataFrame]:
+        start = time.perf_counter()
+        df = await send(batch)
+        return time.perf_counter() - start, df
+
+    async def _send_composite(self,
+                              http_method: str,
+                              url: str,
+                              sobject: str,
+                              all_or_none: bool,
+                              result_schema: dict[str, pl.DataType],
+                              batch: pl.DataFrame,
+                              attempt: int = 0) -> pl.DataFrame:
+        """Awaited counterpart of Salesforce._send_composite."""
+        with self.conn._span('salesforce.batch', sobject=sobject, operation=http_method, rows=batch.height,
+                             attempt=attempt) as span:
+            start = time.perf_counter()
+            composite_body = Salesforce._composite_body(batch, sobject, all_or_none)
+            encoded = time.perf_counter()
+            try:
+                response = await self._request(http_method, url, headers=self.headers, content=composite_body)
+                response.raise_for_status()
+                received = time.perf_counter()
+                results = Salesforce._batch_results(batch, result_schema, response.content)
+            except httpx.HTTPError as e:
+                logger.warning(f"Composite {http_method} batch of {batch.height} {sobject} records failed: {e}")
+                received = time.perf_counter()
+                results = Salesforce._batch_results(batch, result_schema, error=e)
+            if span is not None:
+                span.update(bytes_sent=len(composite_body), encode_seconds=encoded - start,
+                            parse_seconds=time.perf_counter() - received)
+            resend = partial(self._send_composite, http_method, url, sobject, all_or_none, result_schema)
+            results = await self._retry_locked_rows(resend, results, batch, all_or_none, attempt)
+            if span is not None:
+                Salesforce._count_rows(span, results)
+            return results
+
+    async def _send_delete(self, all_or_none: bool, batch: pl.DataFrame, attempt: int = 0) -> pl.DataFrame:
+        """Awaited counterpart of Salesforce._send_delete."""
+        with self.conn._span('salesforce.batch', operation='DELETE', rows=batch.height, attempt=attempt) as span:
+            url = self.conn._build_delete_url(batch['Id'].to_list(), all_or_none)
+            try:
+                response = await self._request('DELETE', url, headers=self.headers)
+                response.raise_for_status()
+                results = Salesforce._batch_results(batch, _COMPOSITE_RESULT_SCHEMA, response.content)
+            except httpx.HTTPError as e:
+                logger.warning(f"Composite DELETE batch of {batch.height} records failed: {e}")
+                results = Salesforce._batch_results(batch, _COMPOSITE_RESULT_SCHEMA, error=e)
+            results = await self._retry_locked_rows(partial(self._send_delete, all_or_none), results, batch,
+                                                    all_or_none, attempt)
+            if span is not None:
+                Salesforce._count_rows(span, results)
+            return results
+
+    async def _retry_locked_rows(self,
+                                 resend,
+                                 results: pl.DataFrame,
+                                 batch: pl.DataFrame,
+                                 all_or_none: bool,
+                                 attempt: int) -> pl.DataFrame:
+        """Awaited counterpart of Salesforce._retry_locked_rows."""
+        locked = Salesforce._locked_rows(results, all_or_none)
+        if not locked.any() or attempt >= self.max_retries:
+            return results
+        delay = self.conn._limiter.throttle(attempt)
+        logger.warning(f"{locked.sum()} records hit UNABLE_TO_LOCK_ROW, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        return Salesforce._splice_retried(results, locked, await resend(batch.filter(locked), attempt=attempt + 1))
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request paced by the shared org rate limiter, backing off and retrying while the org throttles.
+
+        A request rejected for an expired session is sent again once with a renewed session.
+        """
+        limiter = self.conn._limiter
+        with self.conn._span('salesforce.request', method=method, url=url.split('?', 1)[0], retries=0) as span:
+            for attempt in range(self.max_retries + 1):
+                while (delay := limiter.reserve()) > 0:
+                    await asyncio.sleep(delay)
+                response = await self.client.request(method, url, **kwargs)
+                if self.conn._session_key is not None and Salesforce._is_invalid_session(response):
+                    # Logging in again blocks, so it runs off the event loop
+                    authorization = kwargs.get('headers', {}).get('Authorization')
+                    session_id, _ = await asyncio.to_thread(self.conn._renew_session, authorization)
+                    kwargs['headers'] = {**kwargs['headers'], 'Authorization': f"Bearer {session_id}"}
+                    response = await self.client.request(method, url, **kwargs)
+                limiter.record_usage(response.headers.get('Sforce-Limit-Info'))
+                if not Salesforce._is_throttled(response):
+                    limiter.succeed()
+                    break
+                if attempt == self.max_retries:
+                    break
+                delay = limiter.throttle(attempt, response.headers.get('Retry-After'))
+                logger.warning(f"Salesforce throttled the request ({response.status_code}), retrying in {delay:.1f}s")
+                if span is not None:
+                    span['retries'] += 1
+                await asyncio.sleep(delay)
+            if span is not None:
+                content = kwargs.get('content')
+                usage = limiter.api_usage
+                span.update(status=response.status_code, bytes_sent=len(content) if content else 0,
+                            bytes_received=len(response.content),
+                            api_remaining=usage[1] - usage[0] if usage else None)
+            return response
+
+    async def _bulk2_query_pages(self, soql: str, page_size: int = 50000) -> list[bytes]:
+        """Run a Bulk2 query job and return each locator page of CSV results as raw bytes."""
+        job = await self._bulk2_create_job('query', {
+            "operation": Operation.query.value, "query": soql,
+            "columnDelimiter": ColumnDelimiter.COMMA.value, "lineEnding": LineEnding.LF.value,
+        })
+        await self._bulk2_wait(f"query/{job['id']}")
+        url = f"{self.sf.bulk2_url}query/{job['id']}/results"
+        headers = {**self.headers, "Accept": "text/csv"}
+        params = {"maxRecords": page_size}
+        pages = []
+        while True:
+            response = await self._request('GET', url, headers=headers, params=params)
+            response.raise_for_status()
+            pages.append(response.content)
+            locator = response.headers.get('Sforce-Locator')
+            if not locator or locator == 'null':
+                return pages
+            params = {"maxRecords": page_size, "locator": locator}
+
+    async def _bulk2_load(self,
+                          sobject: str,
+                          operation: Operation,
+                          data: pl.DataFrame | pl.LazyFrame,
+                          to_dataframe: bool,
+                          output_dir: str | None,
+                          max_uploads: int,
+                          external_id_field: str | None = None) -> pl.DataFrame:
+        """Load rows through concurrent Bulk2 ingest jobs and hand their results to the ingest output.
+
+        CSV payloads are encoded off the event loop from the streamed source, and encoding pauses
+        while max_uploads payloads are still being uploaded so memory stays bounded. When any job
+        fails, the others are cancelled and the jobs they left unfinished are aborted in the org.
+        """
+        payloads = self.conn._bulk2_payloads(self.conn._ingest_batches(data))
+        uploads = asyncio.Semaphore(max(1, max_uploads))
+        tasks = []
+        unfinished = set()
+        try:
+            try:
+                while True:
+                    await uploads.acquire()
+                    item = await asyncio.to_thread(next, payloads, None)
+                    if item is None:
+                        break
+                    tasks.append(asyncio.ensure_future(
+                        self._bulk2_ingest_job(sobject, operation, item[0], external_id_field, uploads, unfinished)
+                    ))
+                    del item
+            finally:
+                uploads.release()
+            jobs = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._bulk2_abort(unfinished)
+            raise
+        frames = [(job_id, df) for job_id, df in jobs if df is not None]
+        df = await asyncio.to_thread(Salesforce._ingest_output, frames, to_dataframe, output_dir)
+        if to_dataframe:
+            return df
+
+    async def _bulk2_ingest_job(self,
+                                sobject: str,
+                                operation: Operation,
+                                payload: bytes,
+                                external_id_field: str | None,
+                                uploads: asyncio.Semaphore,
+                                unfinished: set[str]) -> tuple[str, pl.DataFrame | None]:
+        """Create, upload, close and await one Bulk2 ingest job and return its combined results.
+
+        The job id is kept in unfinished until the job completes, so a failed load can abort it.
+        """
+        job = {
+            "object": sobject, "operation": operation.value, "contentType": "CSV",
+            "columnDelimiter": ColumnDelimiter.COMMA.value, "lineEnding": LineEnding.LF.value,
+        }
+        if external_id_field:
+            job["externalIdFieldName"] = external_id_field
+        try:
+            job_id = (await self._bulk2_create_job('ingest', job))['id']
+            unfinished.add(job_id)
+            url = f"{self.sf.bulk2_url}ingest/{job_id}"
+            response = await self._request('PUT', f"{url}/batches", content=payload,
+                                           headers={**self.headers, "Content-Type": "text/csv; charset=UTF-8"})
+            response.raise_for_status()
+            response = await self._request('PATCH', url, json={"state": "UploadComplete"}, headers=self.headers)
+            response.raise_for_status()
+        finally:
+            # The payload has been sent (or abandoned), so the next one can be encoded
+            del payload
+            uploads.release()
+        await self._bulk2_wait(f"ingest/{job_id}")
+        unfinished.discard(job_id)
+
+        async def results_page(results_type: str) -> bytes:
+            response = await self._request('GET', f"{url}/{results_type}",
+                                           headers={**self.headers, "Accept": "text/csv"})
+            response.raise_for_status()
+            return response.content
+
+        pages = await asyncio.gather(*(results_page(results_type) for results_type in _INGEST_STATUSES.values()))
+        return job_id, Salesforce._ingest_frame(dict(zip(_INGEST_STATUSES, pages)))
+
+    async def _bulk2_abort(self, job_ids: set[str]) -> None:
+        """Abort the given Bulk2 ingest jobs, logging the ones that can't be aborted."""
+        async def abort(job_id: str) -> None:
+            try:
+                response = await self._request('PATCH', f"{self.sf.bulk2_url}ingest/{job_id}",
+                                               json={"state": "Aborted"}, headers=self.headers)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.warning(f"Failed to abort Bulk2 job {job_id}: {e}")
+
+        await asyncio.gather(*(abort(job_id) for job_id in job_ids))
+
+    async def _bulk2_create_job(self, kind: str, payload: dict) -> dict:
+        response = await self._request('POST', f"{self.sf.bulk2_url}{kind}", json=payload, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def _bulk2_wait(self, job_path: str) -> dict:
+        """Poll a Bulk2 job with exponentially growing intervals until it completes, without blocking the loop."""
+        interval = _BULK2_POLL_MIN
+        while True:
+            await asyncio.sleep(interval)
+            response = await self._request('GET', f"{self.sf.bulk2_url}{job_path}", headers=self.headers)
+            response.raise_for_status()
+            job = response.json()
+            if job['state'] == 'JobComplete':
+                return job
+            if job['state'] in ('Failed', 'Aborted'):
+                raise RuntimeError(f"Bulk2 job {job['id']} {job['state'].lower()}: {job.get('errorMessage')}")
+            interval = min(_BULK2_POLL_MAX, interval * 2)
@@ -1,58 +1,657 @@
-# TBD
 import polars as pl
-import requests
+import hashlib
+import io
+import json
+import logging
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import cache, partial
 from pprint import pprint
+from typing import Iterator
+import stripe
 from stripe import StripeClient
+try:
+    # Private to stripe-python, so raw page bodies fall back to the public raw_request when it moves
+    from stripe._request_options import extract_options_from_dict
+except ImportError:
+    extract_options_from_dict = None
+
+from . import BaseConnector, _RateLimiter, _backoff
+
+logger = logging.getLogger(__name__)
+
+# List endpoints return at most 100 objects per page
+_PAGE_LIMIT = 100
+# Stripe allows 100 read requests per second in live mode and 25 in test mode
+_MAX_REQUEST_RATE = 25.0
+# The request rate is never halved below this many requests per second
+_MIN_REQUEST_RATE = 1.0
+# Marks the end of one created-range shard on the page queue
+_SHARD_DONE = object()
+# Write rows are handed to the worker pool in slices of this many, so large frames aren't queued at once
+_WRITE_SLICE_ROWS = 10_000
+# Per-row results of create, update and delete, joined to the input rows by position
+_WRITE_RESULT_SCHEMA = {
+    'success': pl.Boolean,
+    'error_code': pl.String,
+    'error_message': pl.String,
+    'idempotency_key': pl.String,
+}
+
+# Top-level Unix timestamps are returned as UTC datetimes; nested ones stay integers
+_TIMESTAMP = pl.Datetime('ms', 'UTC')
+# Objects with arbitrary keys have no fixed schema, so top-level ones are kept as JSON strings
+_JSON_FIELDS = ('metadata', 'payment_method_details')
+_ADDRESS = pl.Struct({'city': pl.String, 'country': pl.String, 'line1': pl.String, 'line2': pl.String,
+                      'postal_code': pl.String, 'state': pl.String})
+_SHIPPING = pl.Struct({'address': _ADDRESS, 'name': pl.String, 'phone': pl.String})
+_RECURRING = pl.Struct({'interval': pl.String, 'interval_count': pl.Int64, 'meter': pl.String,
+                        'trial_period_days': pl.Int64, 'usage_type': pl.String})
+_PRICE_SUMMARY = pl.Struct({'id': pl.String, 'product': pl.String, 'currency': pl.String, 'type': pl.String,
+                            'unit_amount': pl.Int64, 'unit_amount_decimal': pl.String, 'recurring': _RECURRING})
+_PERIOD = pl.Struct({'end': pl.Int64, 'start': pl.Int64})
+_LINE_ITEMS = pl.Struct({
+    'data': pl.List(pl.Struct({
+        'id': pl.String, 'object': pl.String, 'amount': pl.Int64, 'currency': pl.String, 'description': pl.String,
+        'discountable': pl.Boolean, 'invoice': pl.String, 'period': _PERIOD, 'price': _PRICE_SUMMARY,
+        'proration': pl.Boolean, 'quantity': pl.Int64, 'subscription': pl.String, 'type': pl.String,
+    })),
+    'has_more': pl.Boolean, 'total_count': pl.Int64, 'url': pl.String,
+})
+_SUBSCRIPTION_ITEMS = pl.Struct({
+    'data': pl.List(pl.Struct({
+        'id': pl.String, 'object': pl.String, 'created': pl.Int64, 'current_period_end': pl.Int64,
+        'current_period_start': pl.Int64, 'price': _PRICE_SUMMARY, 'quantity': pl.Int64, 'subscription': pl.String,
+    })),
+    'has_more': pl.Boolean, 'total_count': pl.Int64, 'url': pl.String,
+})
+# List endpoint schemas by entity; fields not listed here are dropped
+_SCHEMAS = {
+    'products': {
+        'id': pl.String, 'object': pl.String, 'active': pl.Boolean, 'created': _TIMESTAMP,
+        'default_price': pl.String, 'description': pl.String, 'images': pl.List(pl.String), 'livemode': pl.Boolean,
+        'marketing_features': pl.List(pl.Struct({'name': pl.String})), 'metadata': pl.String, 'name': pl.String,
+        'package_dimensions': pl.Struct({'height': pl.Float64, 'length': pl.Float64, 'weight': pl.Float64,
+                                         'width': pl.Float64}),
+        'shippable': pl.Boolean, 'statement_descriptor': pl.String, 'tax_code': pl.String, 'type': pl.String,
+        'unit_label': pl.String, 'updated': _TIMESTAMP, 'url': pl.String,
+    },
+    'prices': {
+        'id': pl.String, 'object': pl.String, 'active': pl.Boolean, 'billing_scheme': pl.String, 'created': _TIMESTAMP,
+        'currency': pl.String,
+        'custom_unit_amount': pl.Struct({'maximum': pl.Int64, 'minimum': pl.Int64, 'preset': pl.Int64}),
+        'livemode': pl.Boolean, 'lookup_key': pl.String, 'metadata': pl.String, 'nickname': pl.String,
+        'product': pl.String, 'recurring': _RECURRING, 'tax_behavior': pl.String,
+        'tiers': pl.List(pl.Struct({'flat_amount': pl.Int64, 'flat_amount_decimal': pl.String,
+                                    'unit_amount': pl.Int64, 'unit_amount_decimal': pl.String, 'up_to': pl.Int64})),
+        'tiers_mode': pl.String, 'transform_quantity': pl.Struct({'divide_by': pl.Int64, 'round': pl.String}),
+        'type': pl.String, 'unit_amount': pl.Int64, 'unit_amount_decimal': pl.String,
+    },
+    'customers': {
+        'id': pl.String, 'object': pl.String, 'address': _ADDRESS, 'balance': pl.Int64, 'created': _TIMESTAMP,
+        'currency': pl.String, 'default_source': pl.String, 'delinquent': pl.Boolean, 'description': pl.String,
+        'email': pl.String, 'invoice_prefix': pl.String,
+        'invoice_settings': pl.Struct({
+            'custom_fields': pl.List(pl.Struct({'name': pl.String, 'value': pl.String})),
+            'default_payment_method': pl.String, 'footer': pl.String,
+        }),
+        'livemode': pl.Boolean, 'metadata': pl.String, 'name': pl.String, 'next_invoice_sequence': pl.Int64,
+        'phone': pl.String, 'preferred_locales': pl.List(pl.String), 'shipping': _SHIPPING, 'tax_exempt': pl.String,
+        'test_clock': pl.String,
+    },
+    'charges': {
+        'id': pl.String, 'object': pl.String, 'amount': pl.Int64, 'amount_captured': pl.Int64,
+        'amount_refunded': pl.Int64, 'application': pl.String, 'application_fee': pl.String,
+        'application_fee_amount': pl.Int64, 'balance_transaction': pl.String,
+        'billing_details': pl.Struct({'address': _ADDRESS, 'email': pl.String, 'name': pl.String, 'phone': pl.String}),
+        'calculated_statement_descriptor': pl.String, 'captured': pl.Boolean, 'created': _TIMESTAMP,
+        'currency': pl.String, 'customer': pl.String, 'description': pl.String, 'disputed': pl.Boolean,
+        'failure_balance_transaction': pl.String, 'failure_code': pl.String, 'failure_message': pl.String,
+        'fraud_details': pl.Struct({'stripe_report': pl.String, 'user_report': pl.String}), 'invoice': pl.String,
+        'livemode': pl.Boolean, 'metadata': pl.String, 'on_behalf_of': pl.String,
+        'outcome': pl.Struct({'network_status': pl.String, 'reason': pl.String, 'risk_level': pl.String,
+                              'risk_score': pl.Int64, 'seller_message': pl.String, 'type': pl.String}),
+        'paid': pl.Boolean, 'payment_intent': pl.String, 'payment_method': pl.String,
+        'payment_method_details': pl.String, 'receipt_email': pl.String, 'receipt_number': pl.String,
+        'receipt_url': pl.String, 'refunded': pl.Boolean, 'review': pl.String, 'shipping': _SHIPPING,
+        'source_transfer': pl.String, 'statement_descriptor': pl.String, 'statement_descriptor_suffix': pl.String,
+        'status': pl.String, 'transfer_data': pl.Struct({'amount': pl.Int64, 'destination': pl.String}),
+        'transfer_group': pl.String,
+    },
+    'invoices': {
+        'id': pl.String, 'object': pl.String, 'account_country': pl.String, 'account_name': pl.String,
+        'amount_due': pl.Int64, 'amount_paid': pl.Int64, 'amount_remaining': pl.Int64, 'amount_shipping': pl.Int64,
+        'application': pl.String, 'attempt_count': pl.Int64, 'attempted': pl.Boolean, 'auto_advance': pl.Boolean,
+        'automatic_tax': pl.Struct({'enabled': pl.Boolean, 'status': pl.String}), 'billing_reason': pl.String,
+        'collection_method': pl.String, 'created': _TIMESTAMP, 'currency': pl.String, 'customer': pl.String,
+        'customer_address': _ADDRESS, 'customer_email': pl.String, 'customer_name': pl.String,
+        'customer_phone': pl.String, 'customer_shipping': _SHIPPING, 'customer_tax_exempt': pl.String,
+        'default_payment_method': pl.String, 'description': pl.String, 'due_date': _TIMESTAMP,
+        'effective_at': _TIMESTAMP, 'ending_balance': pl.Int64, 'footer': pl.String, 'hosted_invoice_url': pl.String,
+        'invoice_pdf': pl.String, 'lines': _LINE_ITEMS, 'livemode': pl.Boolean, 'metadata': pl.String,
+        'next_payment_attempt': _TIMESTAMP, 'number': pl.String, 'paid': pl.Boolean, 'period_end': _TIMESTAMP,
+        'period_start': _TIMESTAMP, 'receipt_number': pl.String, 'starting_balance': pl.Int64,
+        'statement_descriptor': pl.String, 'status': pl.String,
+        'status_transitions': pl.Struct({'finalized_at': pl.Int64, 'marked_uncollectible_at': pl.Int64,
+                                         'paid_at': pl.Int64, 'voided_at': pl.Int64}),
+        'subscription': pl.String, 'subtotal': pl.Int64, 'subtotal_excluding_tax': pl.Int64, 'tax': pl.Int64,
+        'total': pl.Int64, 'total_excluding_tax': pl.Int64,
+    },
+    'subscriptions': {
+        'id': pl.String, 'object': pl.String, 'application': pl.String, 'billing_cycle_anchor': _TIMESTAMP,
+        'cancel_at': _TIMESTAMP, 'cancel_at_period_end': pl.Boolean, 'canceled_at': _TIMESTAMP,
+        'cancellation_details': pl.Struct({'comment': pl.String, 'feedback': pl.String, 'reason': pl.String}),
+        'collection_method': pl.String, 'created': _TIMESTAMP, 'currency': pl.String,
+        'current_period_end': _TIMESTAMP, 'current_period_start': _TIMESTAMP, 'customer': pl.String,
+        'days_until_due': pl.Int64, 'default_payment_method': pl.String, 'description': pl.String,
+        'ended_at': _TIMESTAMP, 'items': _SUBSCRIPTION_ITEMS, 'latest_invoice': pl.String, 'livemode': pl.Boolean,
+        'metadata': pl.String, 'pause_collection': pl.Struct({'behavior': pl.String, 'resumes_at': pl.Int64}),
+        'schedule': pl.String, 'start_date': _TIMESTAMP, 'status': pl.String, 'test_clock': pl.String,
+        'trial_end': _TIMESTAMP, 'trial_start': _TIMESTAMP,
+    },
+}
+# Id fields that expand[]=data.<field> replaces with the object of another entity
+_EXPANDABLE = {
+    'products': {'default_price': 'prices'},
+    'prices': {'product': 'products'},
+    'charges': {'customer': 'customers', 'invoice': 'invoices'},
+    'invoices': {'customer': 'customers', 'subscription': 'subscriptions'},
+    'subscriptions': {'customer': 'customers', 'latest_invoice': 'invoices'},
+}
 
-from . import BaseConnector
 
 @pl.api.register_dataframe_namespace('stripe')
 class Stripe(BaseConnector):
     def __init__(self, df: pl.DataFrame) -> None:
         self._df = df
 
-    def create(self, client: StripeClient) -> pl.DataFrame:
-        ...
+    def create(self,
+               client: StripeClient,
+               entity: str,
+               data: pl.DataFrame | pl.LazyFrame = None,
+               max_workers: int = 8,
+               max_request_rate: float = _MAX_REQUEST_RATE,
+               max_retries: int = 5,
+               idempotency_prefix: str = '') -> pl.DataFrame:
+        """Create one object of an entity (e.g. 'customers', 'prices') per row and return the per-row results.
+
+        Each row's non-null columns are the create parameters: structs and lists are sent as nested
+        parameters, datetimes as Unix seconds and metadata JSON strings (as read returns them) as
+        objects. Rows are sent concurrently by max_workers threads, paced to max_request_rate per second;
+        rate limited requests halve the rate and back off, and connection and server errors are retried.
+
+        Every row is sent with an idempotency key derived from the entity, the row's position and its
+        parameters, so a retried request, or a re-run of the same frame within Stripe's 24 hour key
+        window, returns the object created the first time instead of creating another. Change
+        idempotency_prefix to create the same rows again deliberately.
+
+        The result is the input with success, error_code, error_message and idempotency_key columns in
+        front, plus the created object's id when the input has no id column. Rows Stripe rejects are
+        reported there rather than raised.
+        """
+        data = self._df if data is None else data
+        return self._write(client, entity, 'create', 'post', data, None, max_workers, max_request_rate, max_retries,
+                           idempotency_prefix)
+
+    def read(self,
+             client: StripeClient,
+             entity: str,
+             params: dict | None = None,
+             shards: int = 1,
+             created: tuple[int | datetime, int | datetime] | None = None,
+             max_workers: int = 4,
+             max_request_rate: float = _MAX_REQUEST_RATE,
+             max_retries: int = 5,
+             schema: dict[str, pl.DataType] | None = None) -> pl.DataFrame:
+        """List every object of an entity (e.g. 'products', 'charges') and return them as one DataFrame.
+
+        Takes the same arguments as read_iter and concatenates its pages.
+        """
+        frames = list(self.read_iter(client, entity, params, shards, created, max_workers, max_request_rate,
+                                     max_retries, schema))
+        if not frames:
+            return pl.DataFrame()
+        return pl.concat(frames, how='diagonal_relaxed')
+
+    def read_iter(self,
+                  client: StripeClient,
+                  entity: str,
+                  params: dict | None = None,
+                  shards: int = 1,
+                  created: tuple[int | datetime, int | datetime] | None = None,
+                  max_workers: int = 4,
+                  max_request_rate: float = _MAX_REQUEST_RATE,
+                  max_retries: int = 5,
+                  schema: dict[str, pl.DataType] | None = None) -> Iterator[pl.DataFrame]:
+        """Follow has_more/starting_after through a list endpoint and yield one DataFrame per page.
 
-    def read(self, client: StripeClient, entity: str) -> pl.DataFrame:
-        # Dynamically get the entity attribute from the client
-        # Convert entity to lowercase to make it case-insensitive
+        params are passed to the list endpoint (filters, expand). Stripe's cursor is sequential, so with
+        shards > 1 the created range (by default from the oldest to the newest object) is split into
+        that many windows, newest first, which are paged concurrently by max_workers threads; pages of
+        different windows are then yielded in the order they arrive. Requests are paced to
+        max_request_rate per second, and rate limited (429) requests halve the rate and back off.
+
+        Pages are fetched as raw bytes, without the Python parse StripeClient.raw_request does, and
+        decoded by the polars JSON reader, typed by the entity's schema (products, prices, customers,
+        invoices, charges and subscriptions have one; pass schema for others, or leave it out to infer
+        each page). A page that doesn't match the schema is an error rather than being inferred.
+        Nested objects and lists stay structs and lists, Id fields named in params['expand'] become
+        structs of the expanded object, top-level timestamps become UTC datetimes and metadata is kept
+        as a JSON string.
+        """
+        # Check if the entity exists in the client (case-insensitive)
         entity_lower = entity.lower()
-        
-        # Check if the entity exists in the client
-        if hasattr(client, entity_lower):
-            entity_resource = getattr(client, entity_lower)
-            
-            # List the entities
-            entities = entity_resource.list()
-            
-            # TODO: Convert to polars DataFrame and return
-            return pl.json_normalize(entities.data, max_level=3)
-            # Return empty DataFrame for now
-            # return pl.DataFrame()
+        if not _has_entity(client, entity_lower):
+            raise ValueError(f"Entity '{entity}' is not supported by the Stripe client")
+        params = dict(params or {})
+        if shards > 1 and 'created' in params:
+            raise ValueError("Pass the created range of a sharded read as created, not in params")
+        path = f"/v1/{entity_lower}"
+        schema = schema or _entity_schema(entity_lower, params.get('expand', []))
+        pacer = _RateLimiter(max_request_rate, _MIN_REQUEST_RATE, initial_rate=max_request_rate)
+        try:
+            if shards <= 1:
+                if created:
+                    params['created'] = {'gte': _timestamp(created[0]), 'lt': _timestamp(created[1])}
+                yield from self._pages(client, path, params, schema, pacer, max_retries)
+                return
+            windows = self._created_windows(client, path, params, pacer, max_retries, shards, created)
+            yield from self._sharded_pages(client, path, params, schema, pacer, max_retries, windows, max_workers)
+        except Exception as e:
+            logger.exception("Failed to execute Stripe read")
+            raise RuntimeError(f"Failed to execute Stripe read: {str(e)}")
+
+    def update(self,
+               client: StripeClient,
+               entity: str,
+               data: pl.DataFrame | pl.LazyFrame = None,
+               max_workers: int = 8,
+               max_request_rate: float = _MAX_REQUEST_RATE,
+               max_retries: int = 5,
+               idempotency_prefix: str = '') -> pl.DataFrame:
+        """Update the object named by each row's id column with the row's other columns.
+
+        Parameters, concurrency, retries, idempotency keys and results are as in create.
+        """
+        data = self._df if data is None else data
+        return self._write(client, entity, 'update', 'post', data, 'id', max_workers, max_request_rate, max_retries,
+                           idempotency_prefix)
+
+    def delete(self,
+               client: StripeClient,
+               entity: str,
+               data: pl.DataFrame | pl.LazyFrame = None,
+               max_workers: int = 8,
+               max_request_rate: float = _MAX_REQUEST_RATE,
+               max_retries: int = 5) -> pl.DataFrame:
+        """Delete the object named by each row's id column and return the per-row results.
+
+        Deletes are idempotent in Stripe, so they are sent without idempotency keys; concurrency,
+        retries and results are otherwise as in create.
+        """
+        data = self._df if data is None else data
+        return self._write(client, entity, 'delete', 'delete', data, 'id', max_workers, max_request_rate, max_retries,
+                           '')
+
+    def _pages(self,
+               client: StripeClient,
+               path: str,
+               params: dict,
+               schema: dict[str, pl.DataType] | None,
+               pacer: _RateLimiter,
+               max_retries: int,
+               stop: threading.Event | None = None) -> Iterator[pl.DataFrame]:
+        """Yield every page of a list endpoint as a DataFrame, following the starting_after cursor.
+
+        Paging ends without requesting another page once stop is set.
+        """
+        params = {**params, 'limit': _PAGE_LIMIT}
+        while stop is None or not stop.is_set():
+            with self._span('stripe.page', path=path) as span:
+                body = self._request(client, 'get', path, params, pacer, max_retries, span, raw=True)
+                df, has_more = self._decode_page(body, schema)
+                if span is not None:
+                    span.update(rows=df.height, bytes_received=len(body))
+            if df.is_empty():
+                break
+            yield df
+            if not has_more:
+                break
+            params = {**params, 'starting_after': df['id'][-1]}
+
+    def _sharded_pages(self,
+                       client: StripeClient,
+                       path: str,
+                       params: dict,
+                       schema: dict[str, pl.DataType] | None,
+                       pacer: _RateLimiter,
+                       max_retries: int,
+                       windows: list[tuple[int, int]],
+                       max_workers: int) -> Iterator[pl.DataFrame]:
+        """Page created-range windows concurrently and yield their pages through a bounded queue."""
+        pages = queue.Queue(maxsize=max(1, max_workers) * 2)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Give up once the consumer has stopped reading, so workers don't block forever
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def fetch(window: tuple[int, int]) -> None:
+            # Windows that start after the consumer has stopped send no requests
+            if stop.is_set():
+                return
+            try:
+                window_params = {**params, 'created': {'gte': window[0], 'lt': window[1]}}
+                for df in self._pages(client, path, window_params, schema, pacer, max_retries, stop):
+                    if not put(df):
+                        return
+                put(_SHARD_DONE)
+            except Exception as e:
+                put(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows) or 1))) as executor:
+            futures = [executor.submit(fetch, window) for window in windows]
+            try:
+                remaining = len(windows)
+                while remaining:
+                    item = pages.get()
+                    if item is _SHARD_DONE:
+                        remaining -= 1
+                    elif isinstance(item, Exception):
+                        raise item
+                    else:
+                        yield item
+            finally:
+                stop.set()
+                for future in futures:
+                    future.cancel()
+
+    def _created_windows(self,
+                         client: StripeClient,
+                         path: str,
+                         params: dict,
+                         pacer: _RateLimiter,
+                         max_retries: int,
+                         shards: int,
+                         created: tuple[int | datetime, int | datetime] | None) -> list[tuple[int, int]]:
+        """Split a created range into evenly spaced [gte, lt) windows, newest first.
+
+        Without an explicit range, the newest object comes from the first page of the list (which is
+        sorted newest first) and the oldest is found by bisecting created[lte] with one-object pages.
+        """
+        if created:
+            start, end = _timestamp(created[0]), _timestamp(created[1])
         else:
+            newest = self._request(client, 'get', path, {**params, 'limit': 1}, pacer, max_retries).data['data']
+            if not newest:
+                return []
+            low, high = -1, newest[0]['created']
+            while high - low > 1:
+                middle = (low + high) // 2
+                older = {**params, 'limit': 1, 'created': {'lte': middle}}
+                if self._request(client, 'get', path, older, pacer, max_retries).data['data']:
+                    high = middle
+                else:
+                    low = middle
+            start, end = high, newest[0]['created'] + 1
+        step = max(1, math.ceil((end - start) / shards))
+        return [(low, min(low + step, end)) for low in range(start, end, step)][::-1]
+
+    def _write(self,
+               client: StripeClient,
+               entity: str,
+               operation: str,
+               method: str,
+               data: pl.DataFrame | pl.LazyFrame,
+               key: str | None,
+               max_workers: int,
+               max_request_rate: float,
+               max_retries: int,
+               idempotency_prefix: str) -> pl.DataFrame:
+        """Send one request per row through a bounded worker pool and join the per-row results to the input."""
+        entity_lower = entity.lower()
+        if not _has_entity(client, entity_lower):
             raise ValueError(f"Entity '{entity}' is not supported by the Stripe client")
+        if isinstance(data, pl.LazyFrame):
+            data = data.collect()
+        if key is not None and key not in data.columns:
+            raise ValueError(f"Data must have an '{key}' column naming the objects to {operation}")
+        path = f"/v1/{entity_lower}"
+        pacer = _RateLimiter(max_request_rate, _MIN_REQUEST_RATE, initial_rate=max_request_rate)
+
+        def send(index: int, row: dict) -> dict:
+            row_path = f"{path}/{row[key]}" if key is not None else path
+            params = _write_params(row, key) if method == 'post' else {}
+            idempotency_key = None
+            if method == 'post':
+                idempotency_key = _idempotency_key(idempotency_prefix, row_path, index, params)
+                params['idempotency_key'] = idempotency_key
+            with self._span('stripe.write', path=path, method=method) as span:
+                try:
+                    response = self._request(client, method, row_path, params, pacer, max_retries, span)
+                    result = {'id': response.data.get('id'), 'success': True, 'error_code': None,
+                              'error_message': None}
+                except stripe.StripeError as e:
+                    logger.warning(f"Stripe {method} of {row_path} failed: {e}")
+                    result = {'id': None, 'success': False, 'error_code': e.code or type(e).__name__,
+                              'error_message': e.user_message or str(e)}
+                if span is not None:
+                    span['success'] = result['success']
+            return {**result, 'idempotency_key': idempotency_key}
+
+        try:
+            results = []
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                offset = 0
+                for rows in data.iter_slices(_WRITE_SLICE_ROWS):
+                    results.extend(executor.map(send, range(offset, offset + rows.height), rows.iter_rows(named=True)))
+                    offset += rows.height
+            # The created object's id leads the results unless the input already names the objects
+            schema = _WRITE_RESULT_SCHEMA if 'id' in data.columns else {'id': pl.String, **_WRITE_RESULT_SCHEMA}
+            # Result columns of an earlier run in the input, e.g. a re-sent result frame, are replaced by this run's
+            return pl.concat([pl.DataFrame(results, schema=schema), data.drop(list(schema), strict=False)],
+                             how='horizontal')
+        except Exception as e:
+            logger.exception(f"Failed to execute Stripe {operation}")
+            raise RuntimeError(f"Failed to execute Stripe {operation}: {str(e)}")
+
+    @staticmethod
+    def _request(client: StripeClient,
+                 method: str,
+                 path: str,
+                 params: dict,
+                 pacer: _RateLimiter,
+                 max_retries: int,
+                 span: dict | None = None,
+                 raw: bool = False):
+        """Send one paced request, backing off and retrying while Stripe rate limits it or fails transiently.
+
+        Connection and server errors are retried too, which is safe for writes because they carry an
+        idempotency key. With raw, the undecoded response body is returned instead of a StripeResponse.
+        """
+        send = partial(_raw_request, client) if raw else client.raw_request
+        for attempt in range(max_retries + 1):
+            pacer.acquire()
+            try:
+                response = send(method, path, **params)
+            except (stripe.RateLimitError, stripe.APIConnectionError, stripe.APIError) as e:
+                if attempt == max_retries or (isinstance(e, stripe.APIError) and (e.http_status or 500) < 500):
+                    raise
+                if isinstance(e, stripe.RateLimitError):
+                    delay = pacer.throttle(attempt)
+                    logger.warning(f"Stripe rate limited the request, retrying in {delay:.1f}s")
+                else:
+                    delay = _backoff(attempt)
+                    logger.warning(f"Stripe request failed ({e}), retrying in {delay:.1f}s")
+                if span is not None:
+                    span['retries'] = span.get('retries', 0) + 1
+                time.sleep(delay)
+                continue
+            pacer.succeed()
+            return response
+
+    @staticmethod
+    def _decode_page(body: bytes, schema: dict[str, pl.DataType] | None) -> tuple[pl.DataFrame, bool]:
+        """Decode the objects and has_more flag of a list page from its raw body with one polars JSON read.
+
+        Arbitrary-key objects have no fixed schema, so the page is read with an inferred schema and then
+        conformed to the entity schema, which raises a ValueError when a value doesn't fit it.
+        """
+        page = pl.read_json(io.BytesIO(body), infer_schema_length=None)
+        has_more = bool(page['has_more'][0])
+        if not page['data'].list.len()[0]:
+            return pl.DataFrame(), has_more
+        df = page.select(pl.col('data').explode()).unnest('data')
+        df = df.with_columns(_json_object(name, df.schema[name]) for name in _JSON_FIELDS if name in df.columns)
+        if schema is None:
+            return df, has_more
+        try:
+            return df.select(
+                _conform(pl.col(name) if name in df.columns else pl.lit(None), df.schema.get(name, pl.Null()),
+                         pl.Int64 if dtype == _TIMESTAMP else dtype, name).alias(name)
+                for name, dtype in schema.items()
+            ).with_columns(
+                (pl.col(name) * 1000).cast(_TIMESTAMP) for name, dtype in schema.items() if dtype == _TIMESTAMP
+            ), has_more
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(f"Stripe page does not match its schema, pass one that does: {e}")
+
+
+def _json_object(name: str, dtype: pl.DataType) -> pl.Expr:
+    """Encode an inferred arbitrary-key object column as JSON text holding only the keys each object has.
+
+    The inferred struct has every key of every object on the page, so the keys an object doesn't have
+    (null fields, as Stripe never returns null metadata values) are left out of its text.
+    """
+    column = pl.col(name)
+    if isinstance(dtype, pl.Null):
+        return column.cast(pl.String)
+    if not isinstance(dtype, pl.Struct):
+        return column
+    entries = [
+        pl.when(column.struct.field(field.name).is_not_null())
+        .then(pl.struct(column.struct.field(field.name)).struct.json_encode().str.slice(1).str.strip_suffix('}'))
+        for field in dtype.fields
+    ]
+    text = pl.concat_str(pl.lit('{'), pl.concat_list(entries).list.drop_nulls().list.join(','), pl.lit('}')) \
+        if entries else pl.lit('{}')
+    return pl.when(column.is_not_null()).then(text).alias(name)
+
+
+def _conform(expr: pl.Expr, source: pl.DataType, target: pl.DataType, path: str) -> pl.Expr:
+    """Cast an inferred column to its schema dtype by struct field name, ignoring extra fields and
+    adding missing ones as nulls; raises a ValueError when a value has a different type."""
+    if isinstance(source, pl.Null) or source == target:
+        return expr.cast(target)
+    if isinstance(target, pl.Struct) and isinstance(source, pl.Struct):
+        fields = {field.name: field.dtype for field in source.fields}
+        return pl.when(expr.is_not_null()).then(pl.struct(
+            (_conform(expr.struct.field(field.name), fields[field.name], field.dtype, f"{path}.{field.name}")
+             if field.name in fields else pl.lit(None, dtype=field.dtype)).alias(field.name)
+            for field in target.fields
+        ))
+    if isinstance(target, pl.List) and isinstance(source, pl.List):
+        return expr.list.eval(_conform(pl.element(), source.inner, target.inner, f"{path}[]"))
+    if target.is_float() and source.is_integer():
+        return expr.cast(target)
+    raise ValueError(f"Stripe page does not match its schema, pass one that does: {path} is {source}, not {target}")
+
+
+def _has_entity(client: StripeClient, entity: str) -> bool:
+    """Whether the client has a service for the entity, looking in the v1 namespace where there is one."""
+    return hasattr(getattr(client, 'v1', client), entity)
 
-    def update(self, client: StripeClient) -> pl.DataFrame:
-        ...
 
-    def delete(self, client: StripeClient) -> pl.DataFrame:
-        ...
+def _raw_request(client: StripeClient, method: str, path: str, **params) -> bytes:
+    """Send a request the way StripeClient.raw_request does, but return the undecoded response body.
+
+    raw_request parses every body into Python objects, which for list pages polars would then parse
+    again; errors are still interpreted by the client, so they raise the same StripeErrors. This relies
+    on stripe-python internals, so when they are missing the body of a public raw_request is returned.
+    """
+    requestor = getattr(client, '_requestor', None)
+    if extract_options_from_dict is None or not hasattr(requestor, 'request_raw') \
+            or not hasattr(requestor, '_interpret_response'):
+        _warn_raw_request_fallback()
+        body = client.raw_request(method, path, **params).body
+    else:
+        options, params = extract_options_from_dict(dict(params))
+        body, code, headers = requestor.request_raw(method, path, params=params, options=options,
+                                                    base_address='api', api_mode='V1', usage=['raw_request'])
+        if not 200 <= code < 300:
+            requestor._interpret_response(body, code, headers, 'V1')
+    return body.encode() if isinstance(body, str) else body
+
+
+@cache
+def _warn_raw_request_fallback() -> None:
+    logger.warning(f"stripe {stripe.VERSION} doesn't expose the request internals raw page reads use, "
+                   "so pages are decoded twice; pin a stripe version this connector supports to avoid it")
+
+
+def _entity_schema(entity: str, expand: list[str]) -> dict[str, pl.DataType] | None:
+    """Return the schema of an entity, typing each expanded Id field as the object it expands to."""
+    if entity not in _SCHEMAS:
+        return None
+    schema = dict(_SCHEMAS[entity])
+    expanded = {path.split('.')[1] for path in expand if path.startswith('data.')}
+    for name, target in _EXPANDABLE.get(entity, {}).items():
+        if name in expanded:
+            # Embedded objects keep integer timestamps and leave out their arbitrary-key objects
+            schema[name] = pl.Struct({field: pl.Int64 if dtype == _TIMESTAMP else dtype
+                                      for field, dtype in _SCHEMAS[target].items() if field not in _JSON_FIELDS})
+    return schema
+
+
+def _write_params(row: dict, key: str | None) -> dict:
+    """Request parameters of one row: nulls and the key column left out, datetimes as Unix seconds and
+    JSON-string metadata decoded back into objects."""
+    params = {}
+    for name, value in row.items():
+        if name == key or value is None:
+            continue
+        if isinstance(value, datetime):
+            value = int(value.timestamp())
+        elif name in _JSON_FIELDS and isinstance(value, str):
+            value = json.loads(value)
+        params[name] = value
+    return params
+
+
+def _idempotency_key(prefix: str, path: str, index: int, params: dict) -> str:
+    """Deterministic idempotency key of one row, so every retry and re-run of it sends the same key."""
+    canonical = json.dumps([path, index, params], sort_keys=True, separators=(',', ':'), default=str)
+    return prefix + hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _timestamp(value: int | datetime) -> int:
+    """Unix seconds of a created bound given as an int or datetime (naive datetimes are local time)."""
+    return int(value.timestamp()) if isinstance(value, datetime) else int(value)
+
 
-        
 if __name__ == "__main__":
-    def login(secret_key: str) -> None:
+    def login(secret_key: str) -> StripeClient:
         """
         Initialize the Stripe client with the provided secret key.
-        """r
+        """
         client = StripeClient(secret_key)
 
         return client
-    
+
     client = login(secret_key="replace with yours")
-    
+
     df = pl.DataFrame()
     products = df.stripe.read(client, 'products')
 
     pprint(products['marketing_features'])
-    products.write_excel('./products.xlsx')
\ No newline at end of file
+    products.write_excel('./products.xlsx')
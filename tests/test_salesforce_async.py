@@ -0,0 +1,104 @@
+import asyncio
+import json
+import polars as pl
+import pytest
+from unittest.mock import patch
+
+httpx = pytest.importorskip("httpx")
+
+from rev_connectors import salesforce
+from rev_connectors.salesforce_async import AsyncSalesforce
+
+
+def make_connector(handler):
+    with patch("rev_connectors.salesforce.SF") as mock_sf:
+        mock_sf.return_value.sf_version = "62.0"
+        mock_sf.return_value.sf_instance = "test.my.salesforce.com"
+        mock_sf.return_value.session_id = "token"
+        mock_sf.return_value.bulk2_url = "https://test.my.salesforce.com/services/data/v62.0/jobs/"
+        salesforce._RATE_LIMITERS.clear()
+        return AsyncSalesforce(credentials={}, client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+def test_async_create_keeps_input_order_with_batches_in_flight():
+    async def handler(request):
+        records = json.loads(request.content)["records"]
+        # Later batches answer first
+        await asyncio.sleep(0.01 * (5 - int(records[0]["Name"][-1])))
+        return httpx.Response(200, json=[{"id": r["Name"][-1], "success": True, "errors": []} for r in records],
+                              headers={"Sforce-Limit-Info": "api-usage=10/15000"})
+
+    async def run():
+        async with make_connector(handler) as conn:
+            data = pl.DataFrame({"Name": [f"Test-Account-{i}" for i in range(1, 6)]})
+            return conn, await conn.create(sobject="Account", data=data, batch_size=2, max_workers=3)
+
+    conn, df = asyncio.run(run())
+    assert df["id"].to_list() == ["1", "2", "3", "4", "5"]
+    assert df["Name"].to_list() == [f"Test-Account-{i}" for i in range(1, 6)]
+    assert conn.conn.api_usage == (10, 15000)
+
+def test_async_bulk2_read_and_ingest_poll_without_blocking():
+    states = {"750Q": ["InProgress", "JobComplete"], "750I": ["UploadComplete", "JobComplete"]}
+    requests_seen = []
+
+    def handler(request):
+        path = request.url.path.split("/jobs/")[-1]
+        requests_seen.append((request.method, path))
+        if request.method == "POST":
+            return httpx.Response(200, json={"id": "750Q" if path == "query" else "750I"})
+        if request.method in ("PUT", "PATCH"):
+            return httpx.Response(201 if request.method == "PUT" else 200, json={})
+        if path in ("query/750Q", "ingest/750I"):
+            job_id = path.split("/")[1]
+            return httpx.Response(200, json={"id": job_id, "state": states[job_id].pop(0)})
+        if path == "query/750Q/results":
+            return httpx.Response(200, content=b'"Id","NumberOfEmployees"\n"001A","5"\n')
+        if path == "ingest/750I/successfulResults":
+            return httpx.Response(200, content=b'"sf__Id","sf__Created","Name"\n"001A","true","A"\n')
+        return httpx.Response(200, content=b"")
+
+    async def run():
+        async with make_connector(handler) as conn:
+            conn.sf.Account.describe.return_value = {"fields": [
+                {"name": "Id", "type": "id"}, {"name": "NumberOfEmployees", "type": "int"},
+            ]}
+            return await asyncio.gather(
+                conn.read("SELECT Id, NumberOfEmployees FROM Account", method="bulk2"),
+                conn.create(sobject="Account", data=pl.DataFrame({"Name": ["A"]}), method="bulk2"),
+            )
+
+    with patch("rev_connectors.salesforce_async._BULK2_POLL_MIN", 0.0):
+        read, created = asyncio.run(run())
+    assert read.schema["NumberOfEmployees"] == pl.Int64 and read["Id"].to_list() == ["001A"]
+    assert created["status"].to_list() == ["success"]
+    assert ("PATCH", "ingest/750I") in requests_seen
+
+def test_async_bulk2_load_aborts_open_jobs_when_an_upload_fails():
+    created = iter(["750A", "750B"])
+    aborted = []
+
+    async def handler(request):
+        path = request.url.path.split("/jobs/")[-1]
+        if request.method == "POST":
+            return httpx.Response(200, json={"id": next(created)})
+        if request.method == "PUT" and path == "ingest/750A/batches":
+            await asyncio.sleep(0.05)
+            return httpx.Response(500, json=[{"errorCode": "UNKNOWN_EXCEPTION", "message": "boom"}])
+        if request.method == "PATCH":
+            if json.loads(request.content)["state"] == "Aborted":
+                aborted.append(path.split("/")[1])
+            return httpx.Response(200, json={})
+        if request.method == "GET":
+            return httpx.Response(200, json={"id": path.split("/")[1], "state": "InProgress"})
+        return httpx.Response(201, json={})
+
+    async def run():
+        async with make_connector(handler) as conn:
+            data = pl.DataFrame({"Name": ["A" * 100, "B" * 100]})
+            await conn.create(sobject="Account", data=data, method="bulk2", max_workers=2)
+
+    with patch("rev_connectors.salesforce._BULK2_MAX_UPLOAD_BYTES", 150), \
+            patch("rev_connectors.salesforce_async._BULK2_POLL_MIN", 0.01):
+        with pytest.raises(RuntimeError, match="500"):
+            asyncio.run(run())
+    assert sorted(aborted) == ["750A", "750B"]
@@ -0,0 +1,234 @@
+import json
+import polars as pl
+import pytest
+import re
+import stripe
+import threading
+from stripe import StripeClient
+from unittest.mock import patch
+from urllib.parse import parse_qsl, urlsplit
+
+import rev_connectors
+from rev_connectors import stripe as stripe_connector
+
+
+class FakeStripeAPI(stripe.HTTPClient):
+    """Stripe HTTP API over in-memory objects, listed newest first like Stripe's, for a real StripeClient."""
+    name = "fake"
+
+    def __init__(self, objects, rate_limited=0):
+        super().__init__()
+        self.objects = sorted(objects, key=lambda obj: obj["created"], reverse=True)
+        self.rate_limited = rate_limited
+        self.reset = False
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, headers, post_data=None, *, _usage=None):
+        url = urlsplit(url)
+        params = decode_params(post_data.decode() if isinstance(post_data, bytes) else post_data or url.query)
+        if "Idempotency-Key" in headers:
+            params["idempotency_key"] = headers["Idempotency-Key"]
+        with self._lock:
+            self.calls.append((method, url.path, params))
+            if self.rate_limited:
+                self.rate_limited -= 1
+                return error_body("rate_limit_error", "Too many requests"), 429, {}
+        if method != "get":
+            return self._write(method, url.path, params)
+        created = params.get("created", {})
+        matches = [
+            obj for obj in self.objects
+            if obj["created"] >= created.get("gte", float("-inf")) and obj["created"] < created.get("lt", float("inf"))
+            and obj["created"] <= created.get("lte", float("inf"))
+        ]
+        if "starting_after" in params:
+            ids = [obj["id"] for obj in matches]
+            matches = matches[ids.index(params["starting_after"]) + 1:]
+        page = matches[:params["limit"]]
+        body = {"object": "list", "data": page, "has_more": len(matches) > len(page), "url": url.path}
+        return json.dumps(body), 200, {}
+
+    def _write(self, method, path, params):
+        if params.get("email") == "invalid":
+            return error_body("invalid_request_error", "Invalid email address: invalid", code="email_invalid"), 400, {}
+        if params.get("name") == "flaky" and not self.reset:
+            self.reset = True
+            raise stripe.APIConnectionError("Connection reset")
+        parts = path.split("/")
+        object_id = parts[3] if len(parts) > 3 else f"cus_{params['idempotency_key'][:8]}"
+        body = {"id": object_id, "deleted": True} if method == "delete" else {"id": object_id, **params}
+        return json.dumps(body), 200, {}
+
+    def close(self):
+        pass
+
+
+def decode_params(query):
+    """Decode Stripe's form encoding (created[gte]=1) back into nested params, with integers as ints."""
+    params = {}
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        *parents, leaf = re.findall(r"[^\[\]]+", key)
+        node = params
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = int(value) if value.lstrip("-").isdigit() else value
+    return params
+
+def error_body(error_type, message, **fields):
+    return json.dumps({"error": {"type": error_type, "message": message, **fields}})
+
+def fake_client(objects, rate_limited=0):
+    api = FakeStripeAPI(objects, rate_limited)
+    return StripeClient("sk_test_fake", http_client=api, max_network_retries=0), api
+
+
+@pytest.fixture
+def stripe_ns():
+    return stripe_connector.Stripe(pl.DataFrame())
+
+@pytest.fixture
+def charges():
+    return [{"id": f"ch_{i:04d}", "object": "charge", "created": 1_700_000_000 + i * 60, "amount": i * 100}
+            for i in range(250)]
+
+def test_read_follows_pagination_cursor(stripe_ns, charges):
+    client, api = fake_client(charges)
+    # List pages are decoded by polars only, never parsed into a StripeResponse
+    with patch("stripe._api_requestor.StripeResponse", side_effect=AssertionError("page parsed in Python")):
+        df = stripe_ns.read(client, "Charges")
+
+    assert df.height == 250 and df["id"].n_unique() == 250
+    assert df["id"][0] == "ch_0249"
+    assert [params.get("starting_after") for _, _, params in api.calls] == [None, "ch_0150", "ch_0050"]
+    assert all(path == "/v1/charges" for _, path, _ in api.calls)
+
+def test_read_iter_yields_pages(stripe_ns, charges):
+    client, _ = fake_client(charges)
+    pages = list(stripe_ns.read_iter(client, "charges"))
+    assert [page.height for page in pages] == [100, 100, 50]
+
+def test_read_falls_back_to_public_raw_request(stripe_ns, charges):
+    client, api = fake_client(charges)
+    with patch.object(stripe_connector, "extract_options_from_dict", None):
+        df = stripe_ns.read(client, "charges")
+
+    assert df.height == 250 and len(api.calls) == 3
+
+def test_sharded_read_covers_every_object_once(stripe_ns, charges):
+    client, api = fake_client(charges)
+    df = stripe_ns.read(client, "charges", shards=4, max_workers=3)
+
+    assert sorted(df["id"].to_list()) == sorted(charge["id"] for charge in charges)
+    windows = {(params["created"]["gte"], params["created"]["lt"]) for _, _, params in api.calls
+               if "gte" in params.get("created", {})}
+    assert len(windows) == 4
+    assert min(low for low, _ in windows) == charges[0]["created"]
+
+def test_sharded_read_iter_stops_requesting_when_closed(stripe_ns):
+    charges = [{"id": f"ch_{i:04d}", "object": "charge", "created": 1_700_000_000 + i, "amount": i} for i in range(2000)]
+    client, api = fake_client(charges)
+    pages = stripe_ns.read_iter(client, "charges", shards=8, max_workers=1)
+    assert next(pages).height == 100
+    pages.close()
+
+    windows = {params["created"]["gte"] for _, _, params in api.calls if "lt" in params.get("created", {})}
+    assert len(windows) == 1
+
+def test_read_backs_off_when_rate_limited(stripe_ns, charges):
+    client, _ = fake_client(charges[:10], rate_limited=2)
+    with patch.object(stripe_connector.time, "sleep") as sleep:
+        df = stripe_ns.read(client, "charges", max_request_rate=100)
+
+    assert df.height == 10
+    assert len([call for call in sleep.call_args_list if call.args[0] >= rev_connectors._BACKOFF_BASE / 2]) == 2
+
+def test_read_types_pages_by_entity_schema(stripe_ns, charges):
+    for i, charge in enumerate(charges):
+        charge["metadata"] = {f"key_{i % 3}": str(i)}
+        charge["outcome"] = {"risk_level": "normal", "risk_score": i % 100}
+        charge["customer"] = {"id": f"cus_{i}", "object": "customer", "created": 1_600_000_000, "metadata": {}}
+    client, _ = fake_client(charges)
+    df = stripe_ns.read(client, "charges", params={"expand": ["data.customer"]})
+
+    assert df.height == 250 and df.columns == list(stripe_connector._SCHEMAS["charges"])
+    assert df.schema["created"] == pl.Datetime("ms", "UTC") and df.schema["amount"] == pl.Int64
+    assert df.schema["outcome"] == stripe_connector._SCHEMAS["charges"]["outcome"]
+    assert df["customer"].struct.field("id")[0] == "cus_249"
+    assert df.schema["customer"].to_schema()["created"] == pl.Int64
+    assert json.loads(df["metadata"][0]) == {"key_0": "249"}
+    assert df["payment_method_details"].is_null().all()
+
+def test_read_rejects_pages_not_matching_schema(stripe_ns, charges):
+    charges[5]["amount"] = "unknown"
+    client, _ = fake_client(charges)
+    with pytest.raises(RuntimeError, match="does not match its schema"):
+        stripe_ns.read(client, "charges")
+
+def test_read_infers_entities_without_schema(stripe_ns):
+    objects = [{"id": f"co_{i:03d}", "created": 1_700_000_000 + i, "metadata": {f"k{i}": "v"}} for i in range(150)]
+    client, _ = fake_client(objects)
+    df = stripe_ns.read(client, "coupons")
+
+    assert df.height == 150 and df.schema["metadata"] == pl.String
+
+def test_read_rejects_unknown_entity(stripe_ns):
+    client, _ = fake_client([])
+    with pytest.raises(ValueError):
+        stripe_ns.read(client, "widgets")
+
+def test_create_reports_each_row_in_input_order(stripe_ns):
+    data = pl.DataFrame({"name": [f"Customer {i}" for i in range(30)], "email": [f"c{i}@example.com" for i in range(30)]})
+    data = data.with_columns(pl.when(pl.int_range(30) == 7).then(pl.lit("invalid")).otherwise("email").alias("email"))
+    client, api = fake_client([])
+    df = stripe_ns.create(client, "customers", data, max_workers=4, max_request_rate=1000)
+
+    assert df.columns[:5] == ["id", "success", "error_code", "error_message", "idempotency_key"]
+    assert df["name"].to_list() == data["name"].to_list()
+    assert df["success"].to_list() == [i != 7 for i in range(30)]
+    assert df["error_code"][7] == "email_invalid" and df["id"][7] is None
+    assert df["idempotency_key"].n_unique() == 30
+    assert all(path == "/v1/customers" and params["idempotency_key"] for method, path, params in api.calls)
+
+def test_create_idempotency_keys_are_deterministic_across_retries(stripe_ns):
+    data = pl.DataFrame({"name": ["flaky", "steady"], "metadata": ['{"source": "crm", "stage": null}', None]})
+    client, api = fake_client([])
+    with patch.object(stripe_connector.time, "sleep"):
+        first = stripe_ns.create(client, "customers", data, max_request_rate=1000)
+    second = stripe_ns.create(fake_client([])[0], "customers", data, max_request_rate=1000)
+    prefixed = stripe_ns.create(fake_client([])[0], "customers", data, max_request_rate=1000,
+                                idempotency_prefix="rerun-")
+
+    flaky = [params for _, _, params in api.calls if params["name"] == "flaky"]
+    assert len(flaky) == 2 and flaky[0]["idempotency_key"] == flaky[1]["idempotency_key"]
+    assert flaky[1]["metadata"] == {"source": "crm"}
+    assert first["success"].all() and first["idempotency_key"].to_list() == second["idempotency_key"].to_list()
+    assert all(key.startswith("rerun-") for key in prefixed["idempotency_key"])
+    assert set(prefixed["idempotency_key"]).isdisjoint(first["idempotency_key"])
+
+def test_update_and_delete_address_rows_by_id(stripe_ns):
+    data = pl.DataFrame({"id": ["cus_1", "cus_2"], "email": ["a@example.com", None]})
+    client, api = fake_client([])
+    updated = stripe_ns.update(client, "customers", data, max_request_rate=1000)
+    deleted = data.stripe.delete(client, "customers", max_request_rate=1000)
+
+    assert updated.columns == ["success", "error_code", "error_message", "idempotency_key", "id", "email"]
+    assert updated["success"].all() and deleted["success"].all()
+    assert deleted["idempotency_key"].is_null().all()
+    sent = sorted((method, path, tuple(sorted(params))) for method, path, params in api.calls)
+    assert sent == [("delete", "/v1/customers/cus_1", ()), ("delete", "/v1/customers/cus_2", ()),
+                    ("post", "/v1/customers/cus_1", ("email", "idempotency_key")),
+                    ("post", "/v1/customers/cus_2", ("idempotency_key",))]
+
+def test_update_replaces_result_columns_of_resent_results(stripe_ns):
+    data = pl.DataFrame({"id": ["cus_1"], "email": ["a@example.com"], "success": [False], "error_code": ["rate_limit"]})
+    client, _ = fake_client([])
+    updated = stripe_ns.update(client, "customers", data, max_request_rate=1000)
+
+    assert updated.columns == ["success", "error_code", "error_message", "idempotency_key", "id", "email"]
+    assert updated["success"].all() and updated["error_code"].is_null().all()
+
+def test_update_requires_id_column(stripe_ns):
+    client, _ = fake_client([])
+    with pytest.raises(ValueError):
+        stripe_ns.update(client, "customers", pl.DataFrame({"email": ["a@example.com"]}))